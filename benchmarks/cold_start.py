@@ -0,0 +1,155 @@
+"""
+Cold Start Benchmark
+====================
+Startup time and first-request latency of each app, with the template
+settings from its TEMPLATE CACHE section:
+
+  off               templates are compiled by the first request that uses them
+  precompile        PRECOMPILE_TEMPLATES - compiled while the app starts
+  cache             TEMPLATE_CACHE_DIR, already filled - loaded from disk
+                    by the first request
+  cache_precompile  both - loaded from disk while the app starts
+
+Every measurement is a new Python process (like a new worker after a deploy
+or a scale-up) that imports app.py and sends two requests for a page with
+the test client. The database is seeded once per part beforehand.
+
+How to Run:
+    python benchmarks/cold_start.py                  # parts 1-5
+    python benchmarks/cold_start.py part-4 --runs 20
+
+Prints one JSON object per part and setting, with the median over --runs
+processes of:
+  startup_ms        importing app.py (Flask, SQLAlchemy, the app's own setup)
+  first_request_ms  the first request, including anything compiled on demand
+  second_request_ms a warm request, for comparison
+"""
+
+import argparse
+import importlib.util
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import time
+
+from common import copy_part, git_commit, remove_copy
+
+# A page rendered from each app's biggest template
+PAGES = {
+    'part-1': '/',
+    'part-2': '/',
+    'part-3': '/',
+    'part-4': '/',
+    'part-5': '/',
+}
+
+CACHE_DIR = '.template_cache'
+
+SETTINGS = {
+    'off': {},
+    'precompile': {'PRECOMPILE_TEMPLATES': '1'},
+    'cache': {'TEMPLATE_CACHE_DIR': CACHE_DIR},
+    'cache_precompile': {'TEMPLATE_CACHE_DIR': CACHE_DIR, 'PRECOMPILE_TEMPLATES': '1'},
+}
+
+# Everything these scripts read from the environment
+TEMPLATE_ENV = ('TEMPLATE_CACHE_DIR', 'PRECOMPILE_TEMPLATES')
+
+
+def child(part, workdir, seed_rows):
+    """Runs in the measured process: import the app, then request its page"""
+    os.chdir(workdir)
+    sys.path.insert(0, workdir)
+
+    start = time.perf_counter()
+    spec = importlib.util.spec_from_file_location('app', os.path.join(workdir, 'app.py'))
+    module = importlib.util.module_from_spec(spec)
+    sys.modules['app'] = module
+    spec.loader.exec_module(module)
+    startup = time.perf_counter() - start
+
+    module.app.logger.disabled = True
+    if seed_rows is not None:
+        from seed import SEEDERS
+        SEEDERS[part](module, seed_rows)
+        return
+
+    client = module.app.test_client()
+    timings = []
+    for _ in range(2):
+        start = time.perf_counter()
+        response = client.get(PAGES[part])
+        response.get_data()
+        response.close()
+        timings.append(time.perf_counter() - start)
+        if response.status_code >= 400:
+            raise SystemExit(f'{part}: GET {PAGES[part]} returned {response.status_code}')
+
+    print(json.dumps({'startup': startup, 'first_request': timings[0], 'second_request': timings[1]}))
+
+
+def run_child(part, workdir, env, seed_rows=None):
+    command = [sys.executable, __file__, part, '--child', workdir]
+    if seed_rows is not None:
+        command += ['--seed', str(seed_rows)]
+    environ = {k: v for k, v in os.environ.items() if k not in TEMPLATE_ENV}
+    out = subprocess.run(command, env={**environ, **env}, capture_output=True, text=True)
+    if out.returncode != 0:
+        raise RuntimeError(out.stderr.strip().splitlines()[-1] if out.stderr.strip() else out.returncode)
+    return json.loads(out.stdout.strip().splitlines()[-1]) if seed_rows is None else None
+
+
+def benchmark(part, args, commit):
+    workdir = copy_part(part, fresh_db=True)
+    try:
+        run_child(part, workdir, {}, seed_rows=args.rows)
+        results = []
+        for name, env in SETTINGS.items():
+            shutil.rmtree(os.path.join(workdir, CACHE_DIR), ignore_errors=True)
+            if 'TEMPLATE_CACHE_DIR' in env:
+                run_child(part, workdir, env)  # fills the cache, as a build step would
+
+            runs = [run_child(part, workdir, env) for _ in range(args.runs)]
+            median = {key: statistics.median(run[key] for run in runs) for key in runs[0]}
+            results.append({
+                'commit': commit,
+                'part': part,
+                'setting': name,
+                'page': PAGES[part],
+                'runs': args.runs,
+                **{f'{key}_ms': round(value * 1000, 2) for key, value in median.items()},
+            })
+        return results
+    finally:
+        remove_copy(workdir)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Startup and first-request time per template setting')
+    parser.add_argument('parts', nargs='*', default=sorted(PAGES))
+    parser.add_argument('--runs', type=int, default=7, help='processes per setting')
+    parser.add_argument('--rows', type=int, default=100, help='rows to seed')
+    parser.add_argument('--child', help=argparse.SUPPRESS)
+    parser.add_argument('--seed', type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args.parts[0], args.child, args.seed)
+        return
+
+    commit = git_commit()
+    for part in args.parts:
+        try:
+            results = benchmark(part, args, commit)
+        except Exception as e:  # e.g. part-5 without python-dotenv installed
+            print(f'{part}: skipped ({e})', file=sys.stderr)
+            continue
+        for result in results:
+            print(json.dumps(result), flush=True)
+
+
+if __name__ == '__main__':
+    main()
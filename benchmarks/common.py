@@ -0,0 +1,135 @@
+"""
+Shared helpers for the benchmark scripts.
+"""
+
+import contextlib
+import glob
+import importlib.util
+import math
+import os
+import shutil
+import sqlite3
+import sqlite3.dbapi2
+import subprocess
+import sys
+import tempfile
+import threading
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def copy_part(part, fresh_db=False):
+    """
+    Copy the <part> folder, together with the shared/ helpers it imports,
+    to a new temporary folder and return the path of the copied part.
+    With fresh_db=True the copied .db files are removed, so the app starts
+    from empty tables. Remove it with remove_copy().
+    """
+    tmp = tempfile.mkdtemp(prefix=f'bench-{part}-')
+    workdir = os.path.join(tmp, part)
+    shutil.copytree(os.path.join(ROOT, part), workdir)
+    shutil.copytree(os.path.join(ROOT, 'shared'), os.path.join(tmp, 'shared'))
+    if fresh_db:
+        for path in glob.glob(os.path.join(workdir, '**', '*.db*'), recursive=True):
+            os.remove(path)
+    return workdir
+
+
+def remove_copy(workdir):
+    """Delete a folder made by copy_part()"""
+    shutil.rmtree(os.path.dirname(workdir), ignore_errors=True)
+
+
+@contextlib.contextmanager
+def load_part(part, fresh_db=False):
+    """
+    Import <part>/app.py from a throwaway copy of the folder (see
+    copy_part), so the benchmark's database writes never touch the real
+    .db files. Yields the imported module.
+    """
+    workdir = copy_part(part, fresh_db)
+    cwd = os.getcwd()
+    os.chdir(workdir)
+    name = f'bench_{part.replace("-", "_")}_app'
+    try:
+        spec = importlib.util.spec_from_file_location(name, os.path.join(workdir, 'app.py'))
+        module = importlib.util.module_from_spec(spec)
+        sys.modules[name] = module
+        spec.loader.exec_module(module)
+        yield module
+    finally:
+        sys.modules.pop(name, None)
+        os.chdir(cwd)
+        remove_copy(workdir)
+
+
+class StatementCounter:
+    """Thread-safe count of the SELECT/INSERT/UPDATE/DELETE statements run"""
+
+    KEYWORDS = ('SELECT', 'INSERT', 'UPDATE', 'DELETE', 'WITH')
+
+    def __init__(self):
+        self.total = 0
+        self._lock = threading.Lock()
+
+    def add(self, sql):
+        words = sql.lstrip().split(None, 1)
+        if words and words[0].upper() in self.KEYWORDS:
+            with self._lock:
+                self.total += 1
+
+
+@contextlib.contextmanager
+def count_statements():
+    """
+    Count the SQL statements run while the block is active. SQLite
+    connections report through sqlite3's trace callback (this sees both the
+    raw sqlite3 apps and SQLAlchemy); other databases are counted with a
+    SQLAlchemy event. Only connections opened inside the block are
+    counted, so load the app inside it. Yields a StatementCounter.
+    """
+    counter = StatementCounter()
+    original_connect = sqlite3.connect
+
+    def connect(*args, **kwargs):
+        conn = original_connect(*args, **kwargs)
+        conn.set_trace_callback(counter.add)
+        return conn
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if conn.dialect.name != 'sqlite':
+            counter.add(statement)
+
+    try:
+        from sqlalchemy import event
+        from sqlalchemy.engine import Engine
+    except ImportError:
+        Engine = None
+
+    sqlite3.connect = sqlite3.dbapi2.connect = connect
+    if Engine is not None:
+        event.listen(Engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        yield counter
+    finally:
+        sqlite3.connect = sqlite3.dbapi2.connect = original_connect
+        if Engine is not None:
+            event.remove(Engine, 'before_cursor_execute', before_cursor_execute)
+
+
+def percentile(sorted_values, p):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return None
+    rank = max(1, math.ceil(p / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def git_commit():
+    """Short hash of the checked-out commit, to label results (None outside git)"""
+    try:
+        out = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT,
+                             capture_output=True, text=True, check=True)
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return out.stdout.strip()
@@ -0,0 +1,130 @@
+"""
+Compression Benchmark
+=====================
+CPU time spent compressing real responses against the bytes it saves.
+Each part is seeded (see seed.py), the routes below are fetched without
+compression, and their bodies are compressed again and again with the
+apps' Compressor (see shared/compression.py) at several levels:
+
+  whole   the body in one go, as for a normal response
+  stream  the pieces the app yields, each flushed, as for a streamed one
+
+brotli is only measured when the brotli package is installed.
+
+How to Run:
+    python benchmarks/compression.py                  # parts 1-4
+    python benchmarks/compression.py part-4 --rows 10000
+
+Prints one JSON object per route, encoding and level, with the body size,
+the compressed size and the time to compress it (best of --repeat).
+"""
+
+import argparse
+import contextlib
+import json
+import subprocess
+import sys
+import time
+
+from common import ROOT, git_commit, load_part
+from seed import SEEDERS
+
+sys.path.insert(0, ROOT)
+from shared.compression import Compressor, brotli
+
+# Large student and book payloads, HTML and JSON
+ROUTES = {
+    'part-1': ['/', '/?all=1'],
+    'part-2': ['/'],
+    'part-3': ['/courses'],
+    'part-4': ['/api/books?per_page=100', '/api/books/search?q=book', '/api/books/search?q=book&stream=1'],
+}
+
+LEVELS = {
+    'gzip': ('COMPRESS_LEVEL', [1, 6, 9]),
+    'br': ('COMPRESS_BR_QUALITY', [1, 4, 11]),
+}
+
+
+def fetch_chunks(client, url):
+    """The body of GET url, as the pieces the app produced them"""
+    response = client.get(url, buffered=False)
+    chunks = [c.encode() if isinstance(c, str) else c for c in response.response]
+    response.close()
+    streamed = 'Content-Length' not in response.headers  # unknown length up front
+    return [c for c in chunks if c], streamed
+
+
+def compress_time(m, encoding, chunks, streamed):
+    """Seconds and bytes for compressing the body once"""
+    start = time.perf_counter()
+    compressor = Compressor.for_app(encoding, m.app)
+    if streamed:
+        size = sum(len(compressor.chunk(c)) for c in chunks) + len(compressor.finish())
+    else:
+        size = len(compressor.compress(b''.join(chunks)))
+    return time.perf_counter() - start, size
+
+
+def benchmark(part, args, commit):
+    results = []
+    with load_part(part, fresh_db=True) as m:
+        m.app.logger.disabled = True
+        with contextlib.redirect_stdout(sys.stderr):  # keep stdout pure JSON
+            SEEDERS[part](m, args.rows)
+        encodings = ['gzip'] + (['br'] if brotli is not None else [])
+        client = m.app.test_client()
+
+        for url in ROUTES[part]:
+            chunks, streamed = fetch_chunks(client, url)
+            size = sum(map(len, chunks))
+            for encoding in encodings:
+                setting, levels = LEVELS[encoding]
+                for level in levels:
+                    m.app.config[setting] = level
+                    best, compressed = min(compress_time(m, encoding, chunks, streamed)
+                                           for _ in range(args.repeat))
+                    results.append({
+                        'commit': commit,
+                        'part': part,
+                        'route': url,
+                        'mode': 'stream' if streamed else 'whole',
+                        'chunks': len(chunks),
+                        'encoding': encoding,
+                        'level': level,
+                        'bytes': size,
+                        'compressed_bytes': compressed,
+                        'ratio': round(compressed / size, 3),
+                        'compress_ms': round(best * 1000, 3),
+                        'mb_per_s': round(size / best / 1e6, 1),
+                        'us_per_kb_saved': round(best * 1e6 / max(1, (size - compressed) / 1000), 2),
+                    })
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compression CPU time vs. bytes saved')
+    parser.add_argument('parts', nargs='*', default=sorted(ROUTES))
+    parser.add_argument('--rows', type=int, default=2000, help='rows in each main table')
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    if len(args.parts) > 1:
+        # One process per part, like load_test.py
+        for part in args.parts:
+            subprocess.run([sys.executable, __file__, part,
+                            '--rows', str(args.rows), '--repeat', str(args.repeat)])
+        return
+
+    part = args.parts[0]
+    try:
+        results = benchmark(part, args, git_commit())
+    except Exception as e:  # e.g. a part without RESPONSE COMPRESSION
+        print(f'{part}: skipped ({e})', file=sys.stderr)
+        return
+    for result in results:
+        print(json.dumps(result), flush=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,72 @@
+"""
+JSON Serialisation Benchmark (part-4)
+=====================================
+Per-row cost of turning books into a JSON response:
+
+  orm_to_dict     Book.query.all() -> to_dict() -> Flask's default json provider
+  projection      project() tuples -> FastJSONProvider (orjson when installed)
+  projection_std  same, with the stdlib json fallback
+
+How to Run:
+    python benchmarks/json_serialization.py
+    python benchmarks/json_serialization.py --rows 20000 --repeat 10
+"""
+
+import argparse
+import json
+import time
+
+from flask.json.provider import DefaultJSONProvider
+
+from common import load_part
+
+
+def best_of(repeat, fn):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Per-row JSON serialisation cost')
+    parser.add_argument('--rows', type=int, default=5000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    with load_part('part-4') as m:
+        m.init_db()
+        with m.app.app_context():
+            m.db.session.execute(m.db.insert(m.Book), [
+                {'title': f'Book {i}', 'author': f'Author {i % 100}', 'year': 1950 + i % 70,
+                 'isbn': f'bench-{i}', 'author_id': 1 + i % 3}
+                for i in range(args.rows)
+            ])
+            m.db.session.commit()
+            total = m.Book.query.count()
+
+            default_provider = DefaultJSONProvider(m.app)
+
+            def orm_to_dict():
+                m.db.session.expunge_all()
+                books = m.Book.query.all()
+                default_provider.dumps({'books': [b.to_dict() for b in books]})
+
+            def projection():
+                m.app.json.dumps({'books': m.rows_to_dicts(m.project(m.Book.query, m.Book).all())})
+
+            results = {'rows': total, 'orjson': m.orjson is not None}
+            results['orm_to_dict_us_per_row'] = best_of(args.repeat, orm_to_dict) / total * 1e6
+            results['projection_us_per_row'] = best_of(args.repeat, projection) / total * 1e6
+
+            orjson, m.orjson = m.orjson, None
+            results['projection_std_us_per_row'] = best_of(args.repeat, projection) / total * 1e6
+            m.orjson = orjson
+
+    print(json.dumps({k: round(v, 2) if isinstance(v, float) else v for k, v in results.items()}))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,205 @@
+"""
+Load Test
+=========
+Seeds each app with generated data (see seed.py), then requests its routes
+and reports latency percentiles, throughput and SQL statements per request.
+Every route is measured two ways:
+
+  test_client   Flask's test client, one request at a time (app cost only)
+  wsgi_server   a threaded Werkzeug WSGI server on localhost, hit over HTTP
+                by --concurrency clients at once
+
+How to Run:
+    python benchmarks/load_test.py                      # every part
+    python benchmarks/load_test.py part-4 --rows 10000 --requests 500
+    python benchmarks/load_test.py part-5 --mode wsgi_server > before.jsonl
+
+Prints one JSON object per part, route and mode, labelled with the git
+commit, so runs from two commits can be diffed. part-5 reads DATABASE_URL
+like the app does (compare SQLite with PostgreSQL by changing it) - point
+it at a scratch database, the benchmark adds rows to it.
+"""
+
+import argparse
+import contextlib
+import http.client
+import json
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from werkzeug.serving import WSGIRequestHandler, make_server
+
+from common import count_statements, git_commit, load_part, percentile
+from seed import SEEDERS
+
+# Read routes for each app. Write routes are left out so that every request
+# of a run sees the same data.
+ROUTES = {
+    'part-1': ['/', '/?all=1'],
+    'part-2': ['/', '/search?q=Student+1', '/edit/1'],
+    'part-3': ['/', '/courses', '/teachers'],
+    'part-4': [
+        '/api/books',
+        '/api/books?sort=title&per_page=50',
+        '/api/books?cursor=&sort=year&per_page=50',
+        '/api/books?count=cached',
+        '/api/books/1',
+        '/api/authors',
+        '/api/authors/1',
+        '/api/books/search?q=book+1',
+        '/api/authors/search?city=city',
+    ],
+    'part-5': ['/'],
+    'part-6': ['/'],
+}
+
+MODES = ('test_client', 'wsgi_server')
+
+
+class QuietHandler(WSGIRequestHandler):
+    def log_request(self, *args, **kwargs):
+        pass
+
+
+def summarize(latencies, errors, elapsed, statements):
+    latencies = sorted(latencies)
+    n = len(latencies)
+    return {
+        'requests': n,
+        'errors': errors,
+        'p50_ms': round(percentile(latencies, 50) * 1000, 3),
+        'p95_ms': round(percentile(latencies, 95) * 1000, 3),
+        'p99_ms': round(percentile(latencies, 99) * 1000, 3),
+        'mean_ms': round(sum(latencies) / n * 1000, 3),
+        'throughput_rps': round(n / elapsed, 1),
+        'queries_per_request': round(statements / n, 2),
+    }
+
+
+def fetch_test_client(client, url):
+    """GET url and read the whole body (streamed pages render while it is read)"""
+    response = client.get(url)
+    response.get_data()
+    response.close()
+    return response.status_code
+
+
+def run_test_client(app, counter, url, requests, warmup):
+    client = app.test_client()
+    for _ in range(warmup):
+        fetch_test_client(client, url)
+
+    latencies, errors = [], 0
+    before = counter.total
+    start = time.perf_counter()
+    for _ in range(requests):
+        t = time.perf_counter()
+        status = fetch_test_client(client, url)
+        latencies.append(time.perf_counter() - t)
+        errors += status >= 400
+    elapsed = time.perf_counter() - start
+    return summarize(latencies, errors, elapsed, counter.total - before)
+
+
+def run_wsgi_server(port, counter, url, requests, warmup, concurrency):
+    def fetch(_):
+        conn = http.client.HTTPConnection('127.0.0.1', port)
+        t = time.perf_counter()
+        conn.request('GET', url)
+        response = conn.getresponse()
+        response.read()
+        elapsed = time.perf_counter() - t
+        conn.close()
+        return elapsed, response.status
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(fetch, range(warmup)))
+        before = counter.total
+        start = time.perf_counter()
+        results = list(pool.map(fetch, range(requests)))
+        elapsed = time.perf_counter() - start
+
+    errors = sum(1 for _, status in results if status >= 400)
+    return summarize([t for t, _ in results], errors, elapsed, counter.total - before)
+
+
+def benchmark(part, args, commit):
+    """Seed one part, measure its routes and return the result objects"""
+    routes = ROUTES.get(part, [])
+    results = []
+    with count_statements() as counter, load_part(part, fresh_db=True) as m:
+        m.app.logger.disabled = True
+        with contextlib.redirect_stdout(sys.stderr):  # keep stdout pure JSON
+            SEEDERS[part](m, args.rows)
+        routes = [url for url in routes if fetch_test_client(m.app.test_client(), url) != 404]
+        if not routes:
+            print(f'{part}: no routes to benchmark', file=sys.stderr)
+            return []
+
+        server = None
+        if 'wsgi_server' in args.mode:
+            server = make_server('127.0.0.1', 0, m.app, threaded=True, request_handler=QuietHandler)
+            threading.Thread(target=server.serve_forever, daemon=True).start()
+
+        try:
+            for url in routes:
+                for mode in args.mode:
+                    if mode == 'test_client':
+                        stats = run_test_client(m.app, counter, url, args.requests, args.warmup)
+                    else:
+                        stats = run_wsgi_server(server.port, counter, url, args.requests,
+                                                args.warmup, args.concurrency)
+                    results.append({
+                        'commit': commit,
+                        'part': part,
+                        'route': url,
+                        'mode': mode,
+                        'rows': args.rows,
+                        'concurrency': args.concurrency if mode == 'wsgi_server' else 1,
+                        **stats,
+                    })
+        finally:
+            if server is not None:
+                server.shutdown()
+                server.server_close()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Latency, throughput and query counts per route')
+    parser.add_argument('parts', nargs='*', default=sorted(ROUTES))
+    parser.add_argument('--rows', type=int, default=1000, help='rows in each main table')
+    parser.add_argument('--requests', type=int, default=200, help='measured requests per route')
+    parser.add_argument('--warmup', type=int, default=10)
+    parser.add_argument('--concurrency', type=int, default=8, help='clients for wsgi_server')
+    parser.add_argument('--mode', choices=MODES, action='append',
+                        help='test_client and/or wsgi_server (default: both)')
+    args = parser.parse_args()
+    args.mode = args.mode or list(MODES)
+
+    if len(args.parts) > 1:
+        # One process per part, so no part is measured with the others'
+        # modules, pools and caches still in memory
+        options = ['--rows', str(args.rows), '--requests', str(args.requests),
+                   '--warmup', str(args.warmup), '--concurrency', str(args.concurrency)]
+        for mode in args.mode:
+            options += ['--mode', mode]
+        for part in args.parts:
+            subprocess.run([sys.executable, __file__, part, *options])
+        return
+
+    part = args.parts[0]
+    try:
+        results = benchmark(part, args, git_commit())
+    except Exception as e:  # e.g. part-5 without python-dotenv installed
+        print(f'{part}: skipped ({e})', file=sys.stderr)
+        return
+    for result in results:
+        print(json.dumps(result), flush=True)
+
+
+if __name__ == '__main__':
+    main()
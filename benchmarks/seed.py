@@ -0,0 +1,102 @@
+"""
+Seed each app's database with a configurable number of rows.
+
+Every seeder takes the imported app module (see common.load_part) and the
+number of rows for the app's main table, creates the schema with the app's
+own init code and bulk-inserts generated data:
+
+  part-1, part-2  students
+  part-3          school: students, plus rows/20 courses and rows/100 teachers
+  part-4          api_demo: books, plus rows/10 authors
+  part-5          products
+  part-6          inventory products
+"""
+
+COURSES = ['Python', 'JavaScript', 'Java', 'C++', 'Web Development']
+
+
+def seed_students(m, rows):
+    m.init_db()
+    with m.app.app_context():
+        conn = m.get_db_connection()
+        conn.executemany(
+            'INSERT INTO students (name, email, course) VALUES (?, ?, ?)',
+            ((f'Student {i}', f'student{i}@example.com', COURSES[i % len(COURSES)])
+             for i in range(rows))
+        )
+        conn.commit()
+
+
+def seed_school(m, rows):
+    m.init_db()
+    with m.app.app_context():
+        db = m.db
+        db.session.execute(db.insert(m.Teacher), [
+            {'name': f'Teacher {i}', 'email': f'teacher{i}@example.com'}
+            for i in range(max(1, rows // 100))
+        ])
+        teacher_ids = [i for (i,) in db.session.query(m.Teacher.id)]
+        db.session.execute(db.insert(m.Course), [
+            {'name': f'Course {i}', 'description': f'Course number {i}',
+             'teacher_id': teacher_ids[i % len(teacher_ids)]}
+            for i in range(max(1, rows // 20))
+        ])
+        course_ids = [i for (i,) in db.session.query(m.Course.id)]
+        db.session.execute(db.insert(m.Student), [
+            {'name': f'Student {i}', 'email': f'student{i}@example.com',
+             'course_id': course_ids[i % len(course_ids)]}
+            for i in range(rows)
+        ])
+        db.session.commit()
+
+
+def seed_api_demo(m, rows):
+    m.init_db()
+    with m.app.app_context():
+        db = m.db
+        db.session.execute(db.insert(m.Author), [
+            {'name': f'Author {i}', 'city': f'City {i % 50}', 'bio': f'Bio of author {i}'}
+            for i in range(max(1, rows // 10))
+        ])
+        author_ids = [i for (i,) in db.session.query(m.Author.id)]
+        db.session.execute(db.insert(m.Book), [
+            {'title': f'Book {i}', 'author': f'Author {i % len(author_ids)}',
+             'year': 1950 + i % 70, 'isbn': f'bench-{i}',
+             'author_id': author_ids[i % len(author_ids)]}
+            for i in range(rows)
+        ])
+        db.session.commit()
+        if db.engine.dialect.name == 'sqlite':
+            db.session.execute(db.text('ANALYZE'))  # for ?count=estimated
+            db.session.commit()
+
+
+def seed_products(m, rows):
+    m.init_db()
+    with m.app.app_context():
+        m.db.session.execute(m.db.insert(m.Product), [
+            {'name': f'Product {i}', 'price': round(1 + i % 500 * 1.5, 2),
+             'stock': i % 100, 'description': f'Description of product {i}'}
+            for i in range(rows)
+        ])
+        m.db.session.commit()
+
+
+def seed_inventory(m, rows):
+    with m.app.app_context():
+        m.db.create_all()
+        m.db.session.execute(m.db.insert(m.Product), [
+            {'name': f'Product {i}', 'quantity': i % 100, 'price': round(1 + i % 500 * 1.5, 2)}
+            for i in range(rows)
+        ])
+        m.db.session.commit()
+
+
+SEEDERS = {
+    'part-1': seed_students,
+    'part-2': seed_students,
+    'part-3': seed_school,
+    'part-4': seed_api_demo,
+    'part-5': seed_products,
+    'part-6': seed_inventory,
+}
@@ -0,0 +1,148 @@
+"""
+SQLite Concurrency Benchmark
+============================
+Measures read throughput while writes are in flight, with SQLite's default
+rollback journal vs. the WAL settings used by the apps (SQLITE_PRAGMAS).
+
+How to Run:
+    python benchmarks/sqlite_concurrency.py
+    python benchmarks/sqlite_concurrency.py --seconds 10 --readers 8 --writers 2
+
+Prints one JSON object per journal mode.
+"""
+
+import argparse
+import json
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+
+from common import ROOT
+
+sys.path.insert(0, ROOT)
+from shared.sqlite import SQLITE_PRAGMAS as WAL_PRAGMAS  # the apps' settings
+
+# SQLite defaults (rollback journal), with the same busy_timeout so the
+# comparison is about blocking, not about failing fast
+DEFAULT_PRAGMAS = [
+    'PRAGMA journal_mode = DELETE',
+    'PRAGMA busy_timeout = 5000',
+]
+
+
+def connect(path, pragmas):
+    conn = sqlite3.connect(path, check_same_thread=False)
+    for pragma in pragmas:
+        conn.execute(pragma)
+    return conn
+
+
+def seed(path, pragmas, rows):
+    conn = connect(path, pragmas)
+    conn.execute('''
+        CREATE TABLE students (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            email TEXT NOT NULL,
+            course TEXT NOT NULL
+        )
+    ''')
+    conn.executemany(
+        'INSERT INTO students (name, email, course) VALUES (?, ?, ?)',
+        ((f'Student {i}', f'student{i}@example.com', 'Python') for i in range(rows))
+    )
+    conn.commit()
+    conn.close()
+
+
+def run(mode, pragmas, seconds, readers, writers, rows):
+    fd, path = tempfile.mkstemp(suffix='.db')
+    os.close(fd)
+    os.remove(path)
+    seed(path, pragmas, rows)
+
+    stop = threading.Event()
+    lock = threading.Lock()
+    stats = {'reads': 0, 'writes': 0, 'errors': 0, 'read_latency_max_ms': 0.0}
+
+    def reader():
+        conn = connect(path, pragmas)
+        reads, worst = 0, 0.0
+        while not stop.is_set():
+            start = time.perf_counter()
+            try:
+                conn.execute('SELECT * FROM students WHERE id = ?',
+                             (random.randint(1, rows),)).fetchone()
+                reads += 1
+            except sqlite3.OperationalError:
+                with lock:
+                    stats['errors'] += 1
+            worst = max(worst, time.perf_counter() - start)
+        conn.close()
+        with lock:
+            stats['reads'] += reads
+            stats['read_latency_max_ms'] = max(stats['read_latency_max_ms'], worst * 1000)
+
+    def writer():
+        conn = connect(path, pragmas)
+        writes = 0
+        while not stop.is_set():
+            try:
+                conn.execute(
+                    'INSERT INTO students (name, email, course) VALUES (?, ?, ?)',
+                    ('New Student', f'new{random.random()}@example.com', 'Flask')
+                )
+                conn.commit()
+                writes += 1
+            except sqlite3.OperationalError:
+                conn.rollback()
+                with lock:
+                    stats['errors'] += 1
+        conn.close()
+        with lock:
+            stats['writes'] += writes
+
+    threads = ([threading.Thread(target=reader) for _ in range(readers)] +
+               [threading.Thread(target=writer) for _ in range(writers)])
+    for t in threads:
+        t.start()
+    time.sleep(seconds)
+    stop.set()
+    for t in threads:
+        t.join()
+
+    for suffix in ('', '-wal', '-shm', '-journal'):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+
+    return {
+        'journal_mode': mode,
+        'seconds': seconds,
+        'readers': readers,
+        'writers': writers,
+        'reads_per_sec': round(stats['reads'] / seconds, 1),
+        'writes_per_sec': round(stats['writes'] / seconds, 1),
+        'read_latency_max_ms': round(stats['read_latency_max_ms'], 2),
+        'errors': stats['errors'],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--seconds', type=float, default=5)
+    parser.add_argument('--readers', type=int, default=4)
+    parser.add_argument('--writers', type=int, default=1)
+    parser.add_argument('--rows', type=int, default=10000)
+    args = parser.parse_args()
+
+    for mode, pragmas in (('DELETE', DEFAULT_PRAGMAS), ('WAL', WAL_PRAGMAS)):
+        result = run(mode, pragmas, args.seconds, args.readers, args.writers, args.rows)
+        print(json.dumps(result))
+
+
+if __name__ == '__main__':
+    main()
@@ -1,36 +1,146 @@
-from flask import Flask, render_template, request, redirect, url_for, flash
+from flask import Flask, render_template, request, redirect, url_for, flash, g
+import os
+import queue
 import sqlite3  # Built-in Python library for SQLite database
+import sys
+
+# The helpers shared by all parts live in ../shared
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+from shared.compression import init_compression
+from shared.instrumentation import InstrumentedConnection, init_sql_instrumentation
+from shared.pagination import init_pagination, list_args, sql_page
+from shared.sqlite import apply_pragmas
+from shared.templates import init_template_cache, stream_page
 
 app = Flask(__name__)
 app.secret_key = 'your-secret-key-here'  # Required for flash messages
 
 DATABASE = 'students.db'  # Database file name (will be created automatically)
+POOL_SIZE = 8  # Idle connections kept open for reuse
+
+
+# =============================================================================
+# TEMPLATE CACHE
+# =============================================================================
+# Templates can be compiled before the first request, see shared/templates.py.
+
+app.config['TEMPLATE_CACHE_DIR'] = os.getenv('TEMPLATE_CACHE_DIR')
+app.config['PRECOMPILE_TEMPLATES'] = os.getenv('PRECOMPILE_TEMPLATES') == '1'
+init_template_cache(app)
+
+
+# =============================================================================
+# RESPONSE COMPRESSION
+# =============================================================================
+# Text responses are sent gzip/brotli compressed, see shared/compression.py.
+
+app.config['COMPRESS_MIN_SIZE'] = 500   # bytes, smaller bodies are sent as they are
+app.config['COMPRESS_LEVEL'] = 6        # gzip: 1 (fastest) to 9 (smallest)
+app.config['COMPRESS_BR_QUALITY'] = 4   # brotli: 0 (fastest) to 11 (smallest)
+init_compression(app)
+
+
+# =============================================================================
+# SQL INSTRUMENTATION
+# =============================================================================
+# Every statement is timed by InstrumentedConnection, see shared/instrumentation.py.
+
+app.config['SLOW_QUERY_MS'] = 100
+init_sql_instrumentation(app)
 
 
 # =============================================================================
 # DATABASE HELPER FUNCTIONS
 # =============================================================================
 
-def get_db_connection():
-    """Create a connection to the database"""
-    conn = sqlite3.connect(DATABASE)  # Connect to database file
+# Opening a new SQLite connection for every request is wasted work, so idle
+# connections are kept in a small pool. Each request borrows one the first
+# time it calls get_db_connection() and Flask hands it back automatically
+# when the request ends (even if the route raised an exception).
+
+_pool = queue.LifoQueue(maxsize=POOL_SIZE)
+
+
+def _open_connection():
+    """Open a new connection and apply SQLITE_PRAGMAS (see shared/sqlite.py)"""
+    # check_same_thread=False: the connection may be reused by another worker
+    # thread later, but only ever by one request at a time
+    conn = sqlite3.connect(DATABASE, check_same_thread=False, cached_statements=256,
+                           factory=InstrumentedConnection)
     conn.row_factory = sqlite3.Row  # This allows accessing columns by name (like dict)
+    apply_pragmas(conn)
     return conn
 
 
+def get_db_connection():
+    """Get this request's database connection (borrowed from the pool)"""
+    if 'db' not in g:
+        try:
+            g.db = _pool.get_nowait()
+        except queue.Empty:
+            g.db = _open_connection()
+    return g.db
+
+
+@app.teardown_appcontext
+def release_db_connection(exception):
+    """Return the connection to the pool when the request is finished"""
+    conn = g.pop('db', None)
+    if conn is None:
+        return
+    conn.rollback()  # Throw away anything the request didn't commit
+    try:
+        _pool.put_nowait(conn)
+    except queue.Full:
+        conn.close()
+
+
 def init_db():
     """Create the table if it doesn't exist"""
+    with app.app_context():
+        conn = get_db_connection()
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS students (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                name TEXT NOT NULL,
+                email TEXT NOT NULL,
+                course TEXT NOT NULL
+            )
+        ''')  # SQL command to create table with 4 columns
+        # An index makes "WHERE email = ?" a quick lookup instead of reading every row
+        conn.execute('CREATE INDEX IF NOT EXISTS ix_students_email ON students (email)')
+        # Indexes for the sortable columns of the list (see PAGINATION)
+        conn.execute('CREATE INDEX IF NOT EXISTS ix_students_name ON students (name)')
+        conn.execute('CREATE INDEX IF NOT EXISTS ix_students_course ON students (course)')
+        conn.commit()  # Save changes to database
+
+
+# =============================================================================
+# PAGINATION
+# =============================================================================
+# The student list is paged with keyset ("seek") pagination, see
+# shared/pagination.py.
+# Usage: /?sort=name&order=asc&per_page=50, then the Previous / Next links
+
+app.config['PAGE_SORT_COLUMNS'] = ('id', 'name', 'email', 'course')  # only these are put into the SQL
+init_pagination(app)
+
+
+# =============================================================================
+# STREAMED PAGES
+# =============================================================================
+# Pages with every row on them (exports, ?all=1) are sent while they are
+# being rendered, see stream_page() in shared/templates.py. The rows come
+# from a lazy cursor that is only queried once streaming has started.
+
+def all_students():
+    """Every student, in the order asked for, read from the cursor one row at a time"""
+    sort, order, _ = list_args()
+    keys = ['id'] if sort == 'id' else [sort, 'id']
     conn = get_db_connection()
-    conn.execute('''
-        CREATE TABLE IF NOT EXISTS students (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            name TEXT NOT NULL,
-            email TEXT NOT NULL,
-            course TEXT NOT NULL
-        )
-    ''')  # SQL command to create table with 4 columns
-    conn.commit()  # Save changes to database
-    conn.close()  # Close connection
+    yield from conn.execute('SELECT * FROM students ORDER BY ' + ', '.join(f'{key} {order.upper()}' for key in keys))
 
 
 # =============================================================================
@@ -39,15 +149,21 @@ def init_db():
 
 @app.route('/')
 def index():
-    """Home page - Display all students from database"""
+    """Home page - Display one page of students from database (?all=1: every student)"""
     try:
         conn = get_db_connection()  # Step 1: Connect to database
-        students = conn.execute('SELECT * FROM students ORDER BY id DESC').fetchall()  # Step 2: Get all rows (newest first)
-        conn.close()  # Step 3: Close connection
-        return render_template('index.html', students=students)
+        total = conn.execute('SELECT COUNT(*) FROM students').fetchone()[0]
+        if request.args.get('all'):
+            # Step 2: Every row, read from the database while the page is being sent
+            return stream_page('index.html', students=all_students(), total=total)
+        # Step 2: Get the rows of this page (newest first unless ?sort= says otherwise)
+        students, prev_position, next_position = sql_page(conn, 'students')
+        # Step 3: No need to close - the connection goes back to the pool after the request
+        return render_template('index.html', students=students, total=total,
+                               prev_position=prev_position, next_position=next_position)
     except Exception as e:
         flash(f'Error loading students: {str(e)}', 'error')
-        return render_template('index.html', students=[])
+        return render_template('index.html', students=[], total=0)
 
 
 @app.route('/add_sample')
@@ -70,7 +186,6 @@ def add_sample_student():
                 (name, email, course)  # ? are placeholders (safe from SQL injection)
             )
         conn.commit()  # Don't forget to commit!
-        conn.close()
         flash(f'Successfully added {len(sample_students)} sample students!', 'success')
     except Exception as e:
         flash(f'Error adding students: {str(e)}', 'error')
@@ -98,7 +213,6 @@ def add_student():
                 (name, email, course)
             )
             conn.commit()
-            conn.close()
             flash(f'Student {name} added successfully!', 'success')
             return redirect(url_for('index'))
         except Exception as e:
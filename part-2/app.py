@@ -13,33 +13,137 @@ What You'll Learn:
 Prerequisites: Complete part-1 first
 """
 
-from flask import Flask, render_template, request, redirect, url_for, flash
+from flask import Flask, render_template, request, redirect, url_for, flash, g
+import os
+import queue
 import sqlite3
+import sys
+
+# The helpers shared by all parts live in ../shared
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+from shared.assets import init_assets
+from shared.compression import init_compression
+from shared.instrumentation import InstrumentedConnection, init_sql_instrumentation
+from shared.pagination import init_pagination, sql_page
+from shared.sqlite import apply_pragmas
+from shared.templates import init_template_cache
 
 app = Flask(__name__)
 app.secret_key = 'your-secret-key-here'  # Required for flash messages
 
 DATABASE = 'students.db'
+POOL_SIZE = 8  # Idle connections kept open for reuse
 
 
-def get_db_connection():
-    conn = sqlite3.connect(DATABASE)
+# =============================================================================
+# TEMPLATE CACHE
+# =============================================================================
+# Templates can be compiled before the first request, see shared/templates.py.
+
+app.config['TEMPLATE_CACHE_DIR'] = os.getenv('TEMPLATE_CACHE_DIR')
+app.config['PRECOMPILE_TEMPLATES'] = os.getenv('PRECOMPILE_TEMPLATES') == '1'
+init_template_cache(app)
+
+
+# =============================================================================
+# STATIC ASSETS
+# =============================================================================
+# CSS and JS are served fingerprinted, precompressed and cached for a year
+# once `python tools/build_assets.py` has been run, see shared/assets.py.
+
+init_assets(app)
+
+
+# =============================================================================
+# RESPONSE COMPRESSION
+# =============================================================================
+# Text responses are sent gzip/brotli compressed, see shared/compression.py.
+
+app.config['COMPRESS_MIN_SIZE'] = 500   # bytes, smaller bodies are sent as they are
+app.config['COMPRESS_LEVEL'] = 6        # gzip: 1 (fastest) to 9 (smallest)
+app.config['COMPRESS_BR_QUALITY'] = 4   # brotli: 0 (fastest) to 11 (smallest)
+init_compression(app)
+
+
+# =============================================================================
+# SQL INSTRUMENTATION
+# =============================================================================
+# Every statement is timed by InstrumentedConnection, see shared/instrumentation.py.
+
+app.config['SLOW_QUERY_MS'] = 100
+init_sql_instrumentation(app)
+
+
+# =============================================================================
+# DATABASE CONNECTION POOL
+# =============================================================================
+# Each request borrows a connection the first time it calls
+# get_db_connection(); Flask returns it to the pool when the request ends,
+# even if the route raised an exception. Routes never close it themselves.
+
+_pool = queue.LifoQueue(maxsize=POOL_SIZE)
+
+
+def _open_connection():
+    conn = sqlite3.connect(DATABASE, check_same_thread=False, cached_statements=256,
+                           factory=InstrumentedConnection)
     conn.row_factory = sqlite3.Row
+    apply_pragmas(conn)  # SQLITE_PRAGMAS, see shared/sqlite.py
     return conn
 
 
+def get_db_connection():
+    if 'db' not in g:
+        try:
+            g.db = _pool.get_nowait()
+        except queue.Empty:
+            g.db = _open_connection()
+    return g.db
+
+
+@app.teardown_appcontext
+def release_db_connection(exception):
+    conn = g.pop('db', None)
+    if conn is None:
+        return
+    conn.rollback()  # Throw away anything the request didn't commit
+    try:
+        _pool.put_nowait(conn)
+    except queue.Full:
+        conn.close()
+
+
 def init_db():
-    conn = get_db_connection()
-    conn.execute('''
-        CREATE TABLE IF NOT EXISTS students (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            name TEXT NOT NULL,
-            email TEXT NOT NULL,
-            course TEXT NOT NULL
-        )
-    ''')
-    conn.commit()
-    conn.close()
+    with app.app_context():
+        conn = get_db_connection()
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS students (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                name TEXT NOT NULL,
+                email TEXT NOT NULL,
+                course TEXT NOT NULL
+            )
+        ''')
+        # Emails are looked up on every add/edit and must be unique
+        conn.execute('CREATE UNIQUE INDEX IF NOT EXISTS ix_students_email ON students (email)')
+        # Indexes for the sortable columns of the list (see PAGINATION)
+        conn.execute('CREATE INDEX IF NOT EXISTS ix_students_name ON students (name)')
+        conn.execute('CREATE INDEX IF NOT EXISTS ix_students_course ON students (course)')
+        conn.commit()
+
+
+# =============================================================================
+# PAGINATION
+# =============================================================================
+# The student list and the search results are paged with keyset ("seek")
+# pagination, see shared/pagination.py.
+# Usage: /?sort=name&order=asc&per_page=50, then the Previous / Next links
+#        /search?q=ali&sort=name pages through the matches the same way
+
+app.config['PAGE_SORT_COLUMNS'] = ('id', 'name', 'email', 'course')  # only these are put into the SQL
+init_pagination(app)
 
 
 # =============================================================================
@@ -55,40 +159,32 @@ def add_student():
 
         conn = get_db_connection()
 
-        # CHECK IF EMAIL ALREADY EXISTS
-        existing = conn.execute(
-            'SELECT * FROM students WHERE email = ?',
-            (email,)
-        ).fetchone()
-
-        if existing:
-            conn.close()
+        # The unique index on email rejects a taken one, even when two
+        # requests add the same email at the same time
+        try:
+            conn.execute(
+                'INSERT INTO students (name, email, course) VALUES (?, ?, ?)',
+                (name, email, course)
+            )
+            conn.commit()
+        except sqlite3.IntegrityError:
+            conn.rollback()  # end the failed transaction before redirecting
             flash('Email already exists! Use a different email.', 'danger')
             return redirect(url_for('add_student'))
 
-        # INSERT IF EMAIL IS UNIQUE
-        conn.execute(
-            'INSERT INTO students (name, email, course) VALUES (?, ?, ?)',
-            (name, email, course)
-        )
-        conn.commit()
-        conn.close()
-
         flash('Student added successfully!', 'success')
         return redirect(url_for('index'))
 
     return render_template('add.html')
 
 
-# READ - Display all students
+# READ - Display students, one page at a time
 @app.route('/')
 def index():
     conn = get_db_connection()
-    students = conn.execute(
-        'SELECT * FROM students ORDER BY id DESC'
-    ).fetchall()
-    conn.close()
-    return render_template('index.html', students=students)
+    students, prev_position, next_position = sql_page(conn, 'students')
+    return render_template('index.html', students=students,
+                           prev_position=prev_position, next_position=next_position)
 
 
 # ===============================
@@ -96,16 +192,17 @@ def index():
 # ===============================
 @app.route('/search', methods=['GET'])
 def search_student():
-    query = request.args.get('q')
+    query = request.args.get('q', '').strip()
+    if not query:
+        return redirect(url_for('index'))
 
     conn = get_db_connection()
-    students = conn.execute(
-        "SELECT * FROM students WHERE name LIKE ?",
-        ('%' + query + '%',)
-    ).fetchall()
-    conn.close()
+    students, prev_position, next_position = sql_page(
+        conn, 'students', 'name LIKE ?', ('%' + query + '%',)
+    )
 
-    return render_template('index.html', students=students)
+    return render_template('index.html', students=students,
+                           prev_position=prev_position, next_position=next_position)
 
 
 # =============================================================================
@@ -121,30 +218,23 @@ def edit_student(id):
         email = request.form['email']
         course = request.form['course']
 
-        # CHECK IF EMAIL EXISTS FOR ANOTHER STUDENT
-        existing = conn.execute(
-            'SELECT id FROM students WHERE email = ? AND id != ?',
-            (email, id)
-        ).fetchone()
-
-        if existing:
-            conn.close()
+        # The unique index on email rejects one another student has
+        try:
+            conn.execute(
+                'UPDATE students SET name = ?, email = ?, course = ? WHERE id = ?',
+                (name, email, course, id)  # Update WHERE id matches
+            )
+            conn.commit()
+        except sqlite3.IntegrityError:
+            conn.rollback()
             flash('Email already exists! Use a different email.', 'danger')
             return redirect(url_for('edit_student', id=id))
 
-        conn.execute(
-            'UPDATE students SET name = ?, email = ?, course = ? WHERE id = ?',
-            (name, email, course, id)  # Update WHERE id matches
-        )
-        conn.commit()
-        conn.close()
-
         flash('Student updated successfully!', 'success')
         return redirect(url_for('index'))
 
     # GET request: fetch current data and show in form
     student = conn.execute('SELECT * FROM students WHERE id = ?', (id,)).fetchone()
-    conn.close()
     return render_template('edit.html', student=student)
 
 
@@ -157,7 +247,6 @@ def delete_student(id):
     conn = get_db_connection()
     conn.execute('DELETE FROM students WHERE id = ?', (id,))  # Remove row
     conn.commit()
-    conn.close()
 
     flash('Student deleted!', 'danger')  # Show delete message
     return redirect(url_for('index'))
@@ -1,5 +1,18 @@
 from flask import Flask, render_template, request, redirect, url_for, flash
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy.orm import joinedload
+import os
+import sys
+
+# The helpers shared by all parts live in ../shared
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+from shared.compression import init_compression
+from shared.instrumentation import init_sql_instrumentation, instrument_engine
+from shared.pagination import init_pagination, query_page
+from shared.sqlite import use_sqlite_pragmas
+from shared.templates import init_template_cache, stream_page
 
 app = Flask(__name__)
 app.secret_key = 'your-secret-key'
@@ -9,6 +22,53 @@ app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 
 db = SQLAlchemy(app)
 
+# =============================================================================
+# TEMPLATE CACHE
+# =============================================================================
+# Templates can be compiled before the first request, see shared/templates.py.
+
+app.config['TEMPLATE_CACHE_DIR'] = os.getenv('TEMPLATE_CACHE_DIR')
+app.config['PRECOMPILE_TEMPLATES'] = os.getenv('PRECOMPILE_TEMPLATES') == '1'
+init_template_cache(app)
+
+
+# =============================================================================
+# RESPONSE COMPRESSION
+# =============================================================================
+# Text responses are sent gzip/brotli compressed, see shared/compression.py.
+
+app.config['COMPRESS_MIN_SIZE'] = 500   # bytes, smaller bodies are sent as they are
+app.config['COMPRESS_LEVEL'] = 6        # gzip: 1 (fastest) to 9 (smallest)
+app.config['COMPRESS_BR_QUALITY'] = 4   # brotli: 0 (fastest) to 11 (smallest)
+init_compression(app)
+
+
+# =============================================================================
+# SQLITE TUNING
+# =============================================================================
+# Every new SQLite connection runs SQLITE_PRAGMAS (WAL mode etc.), see shared/sqlite.py.
+
+with app.app_context():
+    for engine in db.engines.values():
+        use_sqlite_pragmas(engine)
+
+
+# =============================================================================
+# SQL INSTRUMENTATION
+# =============================================================================
+# Every statement is timed for Server-Timing and /metrics, see shared/instrumentation.py.
+
+app.config['SLOW_QUERY_MS'] = 100
+init_sql_instrumentation(app)
+
+with app.app_context():
+    for engine in db.engines.values():
+        instrument_engine(engine)
+
+
+# =============================================================================
+# DATABASE MODELS
+# =============================================================================
 
 class Teacher(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -28,7 +88,7 @@ class Course(db.Model):
     description = db.Column(db.Text)
 
     # Foreign Key to Teacher
-    teacher_id = db.Column(db.Integer, db.ForeignKey('teacher.id'))
+    teacher_id = db.Column(db.Integer, db.ForeignKey('teacher.id'), index=True)
 
     # One Course -> Many Students
     students = db.relationship('Student', backref='course', lazy=True)
@@ -43,30 +103,87 @@ class Student(db.Model):
     email = db.Column(db.String(120), unique=True, nullable=False)
 
     # Foreign key to Course
-    course_id = db.Column(db.Integer, db.ForeignKey('course.id'), nullable=False)
+    course_id = db.Column(db.Integer, db.ForeignKey('course.id'), nullable=False, index=True)
+
+    # (name, id) index so the list can page through students by name (see PAGINATION)
+    __table_args__ = (db.Index('ix_student_name_sort', 'name', 'id'),)
 
     def __repr__(self):
         return f'<Student {self.name}>'
 
 
+# =============================================================================
+# PAGINATION
+# =============================================================================
+# The student list is paged with keyset ("seek") pagination, see
+# shared/pagination.py.
+# Usage: /?sort=email&order=desc&per_page=50, then the Previous / Next links
+
+app.config['PAGE_SORT_COLUMNS'] = ('id', 'name', 'email')  # only these are put into the SQL
+app.config['PAGE_DEFAULT_SORT'] = 'name'
+init_pagination(app)
+
+
+# =============================================================================
+# STREAMED PAGES
+# =============================================================================
+# Pages with every row on them (like /courses) are sent while they are
+# being rendered, see stream_page() in shared/templates.py. The rows come
+# from a query that loads them in batches (yield_per), in a session of its
+# own, only once streaming has started.
+
+
+# The list pages below avoid the "N+1 query" problem: touching a lazy
+# relationship (course.teacher, course.students) inside a template loop
+# fires one extra query per row. Instead, related rows are JOINed in up
+# front and counts come from a single GROUP BY subquery.
 
 @app.route('/')
 def index():
-    # Order students by name
-    students = Student.query.order_by(Student.name).all()
-    return render_template('index.html', students=students)
+    # One page of students (by name unless ?sort= says otherwise),
+    # loading course + teacher in the same query
+    students, prev_position, next_position = query_page(
+        Student.query.options(joinedload(Student.course).joinedload(Course.teacher)), Student
+    )
+    return render_template('index.html', students=students,
+                           prev_position=prev_position, next_position=next_position)
 
 
 @app.route('/courses')
 def courses():
-    # Show latest courses first
-    all_courses = Course.query.order_by(Course.id.desc()).all()
-    return render_template('courses.html', courses=all_courses)
+    def all_courses():
+        # Number of students per course, computed once for all courses
+        student_counts = (db.session.query(Student.course_id,
+                                           db.func.count(Student.id).label('student_count'))
+                          .group_by(Student.course_id)
+                          .subquery())
+
+        # Show latest courses first -> rows of (course, student_count),
+        # loaded 500 at a time while the page is being sent
+        yield from (db.session.query(Course,
+                                     db.func.coalesce(student_counts.c.student_count, 0))
+                    .outerjoin(student_counts, student_counts.c.course_id == Course.id)
+                    .options(joinedload(Course.teacher))
+                    .order_by(Course.id.desc())
+                    .yield_per(500))
+
+    return stream_page('courses.html', courses=all_courses())
 
 
 @app.route('/teachers')
 def teachers():
-    all_teachers = Teacher.query.order_by(Teacher.name).all()
+    # Number of courses per teacher, computed once for all teachers
+    course_counts = (db.session.query(Course.teacher_id,
+                                      db.func.count(Course.id).label('course_count'))
+                     .group_by(Course.teacher_id)
+                     .subquery())
+
+    # rows of (teacher, course_count)
+    all_teachers = (db.session.query(Teacher,
+                                     db.func.coalesce(course_counts.c.course_count, 0))
+                    .outerjoin(course_counts, course_counts.c.teacher_id == Teacher.id)
+                    .order_by(Teacher.name)
+                    .all())
     return render_template('teachers.html', teachers=all_teachers)
 
 
@@ -134,6 +251,12 @@ def init_db():
     with app.app_context():
         db.create_all()
 
+        # create_all() skips tables that already exist, so add any index
+        # declared on the models that an older school.db doesn't have yet
+        for table in db.metadata.sorted_tables:
+            for index in table.indexes:
+                index.create(db.engine, checkfirst=True)
+
         # Add sample teachers
         if Teacher.query.count() == 0:
             t1 = Teacher(name="Amit Sharma", email="amit@gmail.com")
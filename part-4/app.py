@@ -3,18 +3,166 @@ Part 4: REST API with Flask
 ===========================
 Build a JSON API for database operations
 """
-from flask import Flask, request, jsonify, render_template
+from flask import Flask, request, jsonify, render_template, Response, make_response, g
+from flask.json.provider import DefaultJSONProvider
 from flask_sqlalchemy import SQLAlchemy
-from datetime import datetime
+from flask_sqlalchemy.session import Session as FlaskSession
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from collections import OrderedDict
+from datetime import datetime, timezone
+from functools import wraps
+from urllib.parse import urlencode
+import base64
+import hashlib
+import json
 import os
+import re
+import sys
+import threading
+import time
+import uuid
+
+# The helpers shared by all parts live in ../shared
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+from shared.assets import init_assets
+from shared.compression import init_compression
+from shared.instrumentation import init_sql_instrumentation, instrument_engine
+from shared.metrics import init_metrics, init_pool_metrics
+from shared.sqlite import use_sqlite_pragmas
+from shared.templates import init_template_cache
 
 app = Flask(__name__)
 
 basedir = os.path.abspath(os.path.dirname(__file__))
 app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///' + os.path.join(basedir, 'api_demo.db')
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+app.config['COUNT_STRATEGY'] = 'exact'  # default for ?count=, see total_count()
+
+
+
+class VersionedSession(Session):
+    """
+    Writes through this session bump TableVersion (see bump_versions_on_flush).
+    The events are registered on this class rather than on Session itself,
+    so they don't fire for other apps' sessions in the same process.
+    """
+
+
+class AppSession(FlaskSession, VersionedSession):
+    """db.session: Flask-SQLAlchemy's session plus the TableVersion events"""
+
+
+db = SQLAlchemy(app, session_options={'class_': AppSession})
+
+# =============================================================================
+# TEMPLATE CACHE
+# =============================================================================
+# Templates can be compiled before the first request, see shared/templates.py.
+
+app.config['TEMPLATE_CACHE_DIR'] = os.getenv('TEMPLATE_CACHE_DIR')
+app.config['PRECOMPILE_TEMPLATES'] = os.getenv('PRECOMPILE_TEMPLATES') == '1'
+init_template_cache(app)
+
+
+# =============================================================================
+# STATIC ASSETS
+# =============================================================================
+# CSS and JS are served fingerprinted, precompressed and cached for a year
+# once `python tools/build_assets.py` has been run, see shared/assets.py.
+
+init_assets(app)
+
+
+# =============================================================================
+# RESPONSE COMPRESSION
+# =============================================================================
+# Text responses are sent gzip/brotli compressed, see shared/compression.py.
+
+app.config['COMPRESS_MIN_SIZE'] = 500   # bytes, smaller bodies are sent as they are
+app.config['COMPRESS_LEVEL'] = 6        # gzip: 1 (fastest) to 9 (smallest)
+app.config['COMPRESS_BR_QUALITY'] = 4   # brotli: 0 (fastest) to 11 (smallest)
+init_compression(app)
+
+
+# =============================================================================
+# SQLITE TUNING
+# =============================================================================
+# Every new SQLite connection runs SQLITE_PRAGMAS (WAL mode etc.), see shared/sqlite.py.
+
+with app.app_context():
+    for engine in db.engines.values():
+        use_sqlite_pragmas(engine)
+
+
+# =============================================================================
+# SQL INSTRUMENTATION
+# =============================================================================
+# Every statement is timed for Server-Timing and /metrics, see shared/instrumentation.py.
+
+app.config['SLOW_QUERY_MS'] = 100
+init_sql_instrumentation(app, metrics_route=False)  # /metrics is below (shared/metrics.py)
+
+with app.app_context():
+    for engine in db.engines.values():
+        instrument_engine(engine)
+
+
+# =============================================================================
+# PROMETHEUS METRICS
+# =============================================================================
+# GET /metrics returns request, SQL and connection pool metrics in the
+# Prometheus text format (see shared/metrics.py for the list), and
+# /metrics?format=json the SQL totals per endpoint.
+
+init_metrics(app)
+with app.app_context():
+    init_pool_metrics(app, {'primary': db.engine})
+
+
+# =============================================================================
+# JSON
+# =============================================================================
+# orjson (`pip install orjson`) encodes several times faster than the json
+# module and is used when installed; otherwise the stdlib does the work.
+# Either way datetimes come out as ISO 8601 strings, like to_dict().
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    @staticmethod
+    def default(o):
+        if isinstance(o, datetime):
+            return o.isoformat()
+        return DefaultJSONProvider.default(o)
+
+    def dumps(self, obj, **kwargs):
+        if orjson is not None and not kwargs:
+            return orjson.dumps(obj, default=self.default).decode()
+        return super().dumps(obj, **kwargs)
+
+    def loads(self, s, **kwargs):
+        if orjson is not None and not kwargs:
+            return orjson.loads(s)
+        return super().loads(s, **kwargs)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        if orjson is not None:
+            body = orjson.dumps(obj, default=self.default)
+        else:
+            body = json.dumps(obj, default=self.default, separators=(',', ':'))
+        return self._app.response_class(body, mimetype=self.mimetype)
+
+
+app.json = FastJSONProvider(app)
 
-db = SQLAlchemy(app)
 
 # =============================================================================
 # DATABASE MODELS
@@ -30,6 +178,16 @@ class Author(db.Model):
     # Relationship with Book model
     books = db.relationship('Book', backref='author_ref', lazy=True, cascade='all, delete-orphan')
 
+    # (sort column, id) indexes so cursor pagination can seek instead of scan
+    __table_args__ = (
+        db.Index('ix_author_name_sort', 'name', 'id'),
+        db.Index('ix_author_city_sort', 'city', 'id'),
+        db.Index('ix_author_created_at_sort', 'created_at', 'id'),
+    )
+
+    # Fields returned by the API, in order (see project())
+    api_columns = ('id', 'name', 'bio', 'city', 'created_at', 'books_count')
+
     def to_dict(self):
         return {
             'id': self.id,
@@ -37,7 +195,7 @@ class Author(db.Model):
             'bio': self.bio,
             'city': self.city,
             'created_at': self.created_at.isoformat() if self.created_at else None,
-            'books_count': len(self.books) if self.books else 0
+            'books_count': self.books_count or 0
         }
 
 
@@ -50,7 +208,19 @@ class Book(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
     # Foreign key to Author model
-    author_id = db.Column(db.Integer, db.ForeignKey('author.id'), nullable=True)
+    author_id = db.Column(db.Integer, db.ForeignKey('author.id'), nullable=True, index=True)
+
+    # (sort column, id) indexes so cursor pagination can seek instead of scan.
+    # They also serve plain lookups on the column (search by author/year).
+    __table_args__ = (
+        db.Index('ix_book_title_sort', 'title', 'id'),
+        db.Index('ix_book_author_sort', 'author', 'id'),
+        db.Index('ix_book_year_sort', 'year', 'id'),
+        db.Index('ix_book_created_at_sort', 'created_at', 'id'),
+    )
+
+    # Fields returned by the API, in order (see project())
+    api_columns = ('id', 'title', 'author', 'year', 'isbn', 'created_at', 'author_id')
 
     def to_dict(self):
         return {
@@ -63,20 +233,579 @@ class Book(db.Model):
             'author_id': self.author_id
         }
 
+
+# Number of books per author, computed by a correlated COUNT subquery in the
+# same SELECT that loads the author (instead of loading every Book object).
+# Defined here because it needs the Book model.
+Author.books_count = db.column_property(
+    db.select(db.func.count(Book.id))
+    .where(Book.author_id == Author.id)
+    .correlate_except(Book)
+    .scalar_subquery()
+)
+
+
+class TableVersion(db.Model):
+    """
+    One row per table, updated on every write: a version number (used for
+    ETags) and the table's row count (used for cached total counts).
+    """
+    name = db.Column(db.String(50), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+    row_count = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+
+def bump_table_versions(session, row_deltas):
+    """row_deltas: {table name: change in row count} for each written table"""
+    versions = TableVersion.__table__
+    for table, delta in row_deltas.items():
+        session.connection().execute(
+            db.update(versions)
+            .where(versions.c.name == table)
+            .values(version=versions.c.version + 1,
+                    row_count=versions.c.row_count + delta,
+                    updated_at=datetime.utcnow())
+        )
+
+
+@event.listens_for(VersionedSession, 'before_flush')
+def bump_versions_on_flush(session, flush_context, instances):
+    """Normal ORM writes: db.session.add/delete + commit"""
+    deltas = {}
+    for objects, delta in ((session.new, 1), (session.dirty, 0), (session.deleted, -1)):
+        for obj in objects:
+            if not isinstance(obj, TableVersion):
+                table = obj.__table__.name
+                deltas[table] = deltas.get(table, 0) + delta
+    bump_table_versions(session, deltas)
+
+
+@event.listens_for(VersionedSession, 'do_orm_execute')
+def bump_versions_on_bulk(orm_execute_state):
+    """Bulk statements: db.insert/update(Model), Query.delete()"""
+    state = orm_execute_state
+    if not (state.is_insert or state.is_update or state.is_delete) or not state.bind_mapper:
+        return None
+    table = state.bind_mapper.local_table.name
+    if table == TableVersion.__tablename__:
+        return None
+
+    # Run the statement now so the number of written rows is known
+    result = state.invoke_statement()
+    if state.is_insert:
+        params = state.parameters
+        delta = len(params) if isinstance(params, list) else 1
+    else:
+        # Bulk UPDATEs by primary key don't report a rowcount; the others
+        # do, and one that matched nothing leaves every cached response valid
+        rowcount = getattr(result, 'rowcount', None)
+        if rowcount == 0:
+            return result
+        delta = -rowcount if state.is_delete else 0
+    bump_table_versions(state.session, {table: delta})
+    return result
+
+
+# Read endpoints don't need full ORM objects: project() selects just the
+# API columns as plain tuples (no identity map, no change tracking) and
+# rows_to_dicts() hands them straight to the JSON provider.
+#
+# Clients can narrow that further with ?fields=id,title - only those
+# columns are SELECTed (leaving out books_count skips its COUNT subquery).
+
+def parse_fields(model, raw):
+    """Return (fields, None) or (None, error body) for a ?fields= value"""
+    if not raw:
+        return model.api_columns, None
+    names = {name.strip() for name in raw.split(',') if name.strip()}
+    unknown = names - set(model.api_columns)
+    if unknown or not names:
+        return None, {'success': False,
+                      'error': f'Unknown field(s): {", ".join(sorted(unknown))}',
+                      'allowed_fields': list(model.api_columns)}
+    return tuple(c for c in model.api_columns if c in names), None
+
+
+def get_fields(model):
+    """Return (fields, None) or (None, error response) for ?fields="""
+    fields, error = parse_fields(model, request.args.get('fields'))
+    if error:
+        return None, (jsonify(error), 400)
+    return fields, None
+
+
+def api_columns(model, fields=None):
+    """The model's column attributes for `fields` (default: all API fields)"""
+    return [getattr(model, c) for c in fields or model.api_columns]
+
+
+def project(query, model, fields=None):
+    return query.with_entities(*api_columns(model, fields))
+
+
+def rows_to_dicts(rows, fields=None):
+    if fields is None:
+        return [row._asdict() for row in rows]
+    return [{f: getattr(row, f) for f in fields} for row in rows]
+
+
+# =============================================================================
+# CURSOR (KEYSET) PAGINATION
+# =============================================================================
+#
+# OFFSET pagination makes the database walk past every earlier row, so deep
+# pages get slower and slower. Cursor mode remembers the last row of a page
+# (its sort value + id) and asks for rows "after" it with a WHERE clause,
+# which an index on (sort column, id) answers directly.
+#
+# Usage: GET /api/books?cursor=            -> first page
+#        GET /api/books?cursor=<next_cursor> -> following pages
+#        add &include_total=1 to also run the (slow) COUNT query
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(sort, order, value, last_id):
+    """Pack the position of the last row into an opaque URL-safe token"""
+    if isinstance(value, datetime):
+        value = value.isoformat()
+    payload = json.dumps({'s': sort, 'o': order, 'v': value, 'id': last_id})
+    return base64.urlsafe_b64encode(payload.encode()).decode()
+
+
+def decode_cursor(cursor, sort, order, sort_col):
+    """Unpack a cursor, checking it was issued for the same sort and order"""
+    try:
+        data = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        value, last_id = data['v'], int(data['id'])
+        if data['s'] != sort or data['o'] != order:
+            raise InvalidCursor('Cursor does not match sort/order')
+        if value is not None and isinstance(sort_col.type, db.DateTime):
+            value = datetime.fromisoformat(value)
+    except InvalidCursor:
+        raise
+    except (ValueError, KeyError, TypeError):
+        raise InvalidCursor('Invalid cursor')
+    return value, last_id
+
+
+def keyset_clauses(model, sort, order, cursor):
+    """
+    Return (ORDER BY list, WHERE clause) for the page after `cursor`. The
+    WHERE clause is None on the first page.
+
+    Rows are ordered by (sort column, id). NULLs sort first in ascending
+    order and last in descending order (SQLite's default) on every backend.
+    """
+    sort_col = getattr(model, sort)
+    id_col = model.id
+    desc = order == 'desc'
+
+    if sort == 'id':
+        order_by = [id_col.desc() if desc else id_col.asc()]
+    elif desc:
+        order_by = [sort_col.desc().nulls_last(), id_col.desc()]
+    else:
+        order_by = [sort_col.asc().nulls_first(), id_col.asc()]
+
+    if not cursor:
+        return order_by, None
+
+    value, last_id = decode_cursor(cursor, sort, order, sort_col)
+    after_id = id_col < last_id if desc else id_col > last_id
+    if sort == 'id':
+        where = after_id
+    elif value is None:
+        # Still inside the NULL block: ascending continues into the
+        # non-NULL values, descending has nothing left after NULLs
+        if desc:
+            where = db.and_(sort_col.is_(None), after_id)
+        else:
+            where = db.or_(sort_col.isnot(None), db.and_(sort_col.is_(None), after_id))
+    elif desc:
+        where = db.or_(sort_col < value, db.and_(sort_col == value, after_id), sort_col.is_(None))
+    else:
+        where = db.or_(sort_col > value, db.and_(sort_col == value, after_id))
+    return order_by, where
+
+
+def keyset_fields(model, sort, fields=None):
+    """`fields` plus id and the sort column, which the next cursor needs"""
+    fields = fields or model.api_columns
+    return tuple(c for c in model.api_columns if c in fields or c in ('id', sort))
+
+
+def split_page(rows, per_page, sort, order):
+    """Turn the per_page + 1 fetched rows into (items, next_cursor)"""
+    items = rows[:per_page]
+    next_cursor = None
+    if len(rows) > per_page:
+        last = items[-1]
+        next_cursor = encode_cursor(sort, order, getattr(last, sort), last.id)
+    return items, next_cursor
+
+
+def keyset_page(query, model, sort, order, per_page, cursor, fields=None):
+    """
+    Return (items, next_cursor) for one page after `cursor`. Items are rows
+    of `fields`, plus id and the sort column that the cursor needs.
+    """
+    order_by, where = keyset_clauses(model, sort, order, cursor)
+    query = query.order_by(*order_by)
+    if where is not None:
+        query = query.filter(where)
+
+    # Fetch one extra row to find out whether another page exists
+    rows = project(query, model, keyset_fields(model, sort, fields)).limit(per_page + 1).all()
+    return split_page(rows, per_page, sort, order)
+
+
+def cursor_response(query, model, sort, order, per_page, key, fields=None):
+    """Build the JSON response for a cursor-mode list request"""
+    try:
+        items, next_cursor = keyset_page(query, model, sort, order, per_page,
+                                         request.args.get('cursor'), fields)
+    except InvalidCursor as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+
+    result = {
+        'success': True,
+        'per_page': per_page,
+        'next_cursor': next_cursor,
+        'has_more': next_cursor is not None,
+        key: rows_to_dicts(items, fields)
+    }
+    if request.args.get('include_total', type=int):
+        result['total_items'], result['count_strategy'] = total_count(query, model)
+    return jsonify(result)
+
+
+# =============================================================================
+# RESPONSE CACHE
+# =============================================================================
+#
+# Most traffic is reads, so the GET endpoints for books/authors keep their
+# JSON responses in a cache. Each cached response belongs to a "namespace":
+#
+#   'books' / 'authors'       -> every list page (any query args)
+#   'book:<id>' / 'author:<id>' -> one detail page
+#
+# Write routes call invalidate() with exactly the namespaces they change.
+# Invalidating bumps the namespace's generation token, which is part of
+# every cache key in it, so old entries are simply never looked up again
+# and age out of the cache.
+#
+# invalidate() only reaches the cache of the process that handled the
+# write. So the key also holds the versions of the tables the response was
+# built from - read from table_version, like the ETag (see CONDITIONAL GET).
+# A write in another worker bumps them, and the next request here misses
+# instead of returning the old body under the new ETag.
+#
+# The default backend is an in-process LRU with a TTL. Set REDIS_URL to
+# share one cache between workers (needs `pip install redis`); any object
+# with get/set/delete works as a backend.
+
+CACHE_TTL = 60            # seconds
+CACHE_MAX_ENTRIES = 1024
+
+
+class LRUCache:
+    """Thread-safe in-process cache: least recently used entries go first"""
+
+    def __init__(self, max_entries=CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._data = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            if entry[0] < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return entry[1]
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._data[key] = (time.monotonic() + ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+
+class RedisCache:
+    """Adapter for a redis-py style client (redis.Redis, fakeredis, ...)"""
+
+    def __init__(self, client):
+        self.client = client
+
+    def get(self, key):
+        return self.client.get(key)
+
+    def set(self, key, value, ttl):
+        self.client.set(key, value, ex=ttl)
+
+    def delete(self, key):
+        self.client.delete(key)
+
+
+def create_cache_backend():
+    redis_url = os.getenv('REDIS_URL')
+    if redis_url:
+        import redis
+        return RedisCache(redis.Redis.from_url(redis_url))
+    return LRUCache()
+
+
+response_cache = create_cache_backend()
+cache_stats = {'hits': 0, 'misses': 0, 'invalidations': 0}
+cache_stats_lock = threading.Lock()  # += isn't atomic across request threads
+
+
+def count_cache(stat):
+    """Add one to cache_stats[stat]"""
+    with cache_stats_lock:
+        cache_stats[stat] += 1
+
+# Generation tokens must outlive the entries they protect
+GENERATION_TTL = CACHE_TTL * 10
+
+
+def cache_generation(namespace):
+    """Current generation token of a namespace (created on first use)"""
+    key = f'gen:{namespace}'
+    token = response_cache.get(key)
+    if token is None:
+        token = uuid.uuid4().hex.encode()
+        response_cache.set(key, token, GENERATION_TTL)
+    return token.decode() if isinstance(token, bytes) else token
+
+
+def invalidate(*namespaces):
+    """Drop every cached response in the given namespaces"""
+    for namespace in set(namespaces):
+        response_cache.delete(f'gen:{namespace}')
+        count_cache('invalidations')
+
+
+def cache_key(namespace, args, state):
+    """
+    Key of one cached response: namespace, its generation, the table
+    versions (see table_state()) and the query args
+    """
+    args = urlencode(sorted(args.items(multi=True)))
+    return f'resp:{namespace}:{cache_generation(namespace)}:{state}:{args}'
+
+
+def cached(namespace):
+    """
+    Cache a GET view's JSON response. `namespace` may contain a URL
+    argument, e.g. 'book:{id}'. Use it under @conditional(), which loads
+    the table versions that go into the key; without them nothing is cached.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(**kwargs):
+            state = g.get('table_state')
+            if state is None:
+                return view(**kwargs)
+            key = cache_key(namespace.format(**kwargs), request.args, state)
+
+            body = response_cache.get(key)
+            if body is not None:
+                count_cache('hits')
+                return Response(body, mimetype='application/json')
+
+            count_cache('misses')
+            response = make_response(view(**kwargs))
+            if response.status_code == 200 and not response.is_streamed:
+                response_cache.set(key, response.get_data(), CACHE_TTL)
+            return response
+        return wrapper
+    return decorator
+
+
+def invalidate_books(book_ids=(), author_ids=()):
+    """
+    A book write changes the book lists, the book's own page and - through
+    books_count and the author page's book list - its authors.
+    """
+    invalidate('books', 'authors',
+               *(f'book:{i}' for i in book_ids),
+               *(f'author:{i}' for i in author_ids if i is not None))
+
+
+def invalidate_authors(author_ids=()):
+    invalidate('authors', *(f'author:{i}' for i in author_ids))
+
+
+@app.route('/api/cache/stats', methods=['GET'])
+def get_cache_stats():
+    with cache_stats_lock:
+        stats = dict(cache_stats)
+    lookups = stats['hits'] + stats['misses']
+    return jsonify({
+        'success': True,
+        'backend': type(response_cache).__name__,
+        'hit_rate': round(stats['hits'] / lookups, 3) if lookups else None,
+        **stats
+    })
+
+
+# =============================================================================
+# CONDITIONAL GET (ETAG / LAST-MODIFIED)
+# =============================================================================
+#
+# Every write to a table bumps its row in table_version (see the session
+# events next to the TableVersion model). GET responses carry an ETag built
+# from those versions plus the request's query args, and a Last-Modified
+# date. When a client sends the ETag back in If-None-Match (browsers do
+# this automatically) and nothing changed, the answer is an empty
+# 304 Not Modified - no query for the data, no to_dict(), no body.
+
+def table_state(versions):
+    """'author=3,book=7' for the given TableVersion rows"""
+    return ','.join(f'{v.name}={v.version}' for v in sorted(versions, key=lambda v: v.name))
+
+
+def validators(path, args, versions):
+    """(ETag, Last-Modified) for a GET of `path` given the table versions"""
+    args = urlencode(sorted(args.items(multi=True)))
+    etag = hashlib.sha1(f'{path}?{args}|{table_state(versions)}'.encode()).hexdigest()
+
+    last_modified = max((v.updated_at for v in versions if v.updated_at), default=None)
+    if last_modified:
+        last_modified = last_modified.replace(microsecond=0, tzinfo=timezone.utc)
+    return etag, last_modified
+
+
+def conditional(*tables):
+    """Answer with 304 when none of `tables` changed since the client's copy"""
+    def decorator(view):
+        @wraps(view)
+        def wrapper(**kwargs):
+            versions = db.session.query(TableVersion).filter(TableVersion.name.in_(tables)).all()
+            etag, last_modified = validators(request.path, request.args, versions)
+            g.table_state = table_state(versions)  # for cached()
+
+            if request.if_none_match:
+                not_modified = request.if_none_match.contains_weak(etag)
+            else:
+                since = request.if_modified_since
+                not_modified = bool(since and last_modified and last_modified <= since)
+
+            if not_modified:
+                response = Response(status=304)
+            else:
+                response = make_response(view(**kwargs))
+                if response.status_code != 200:
+                    return response
+            response.set_etag(etag)
+            if last_modified:
+                response.last_modified = last_modified
+            response.cache_control.no_cache = True  # always revalidate
+            return response
+        return wrapper
+    return decorator
+
+
+# =============================================================================
+# TOTAL COUNTS
+# =============================================================================
+#
+# COUNT(*) has to visit every row, so list pages get slower as the table
+# grows. ?count= picks how total_items is worked out:
+#
+#   exact      COUNT(*) (default, see COUNT_STRATEGY)
+#   cached     row_count kept up to date by every write (table_version)
+#   estimated  planner statistics: sqlite_stat1 (after ANALYZE) or
+#              pg_class.reltuples on PostgreSQL
+#
+# If the chosen source isn't available the count falls back to exact.
+# The response's count_strategy says which one was really used.
+
+def estimate_row_count(table):
+    dialect = db.engine.dialect.name
+    if dialect == 'sqlite':
+        has_stats = db.session.execute(db.text(
+            "SELECT 1 FROM sqlite_master WHERE name = 'sqlite_stat1'")).first()
+        if not has_stats:
+            return None
+        # Each row's stat starts with the number of rows in the table
+        stats = db.session.execute(db.text(
+            'SELECT stat FROM sqlite_stat1 WHERE tbl = :table'), {'table': table}).scalars()
+        counts = [int(stat.split()[0]) for stat in stats]
+        return max(counts) if counts else None
+    if dialect == 'postgresql':
+        estimate = db.session.execute(db.text(
+            'SELECT reltuples::bigint FROM pg_class WHERE relname = :table'),
+            {'table': table}).scalar()
+        return estimate if estimate is not None and estimate >= 0 else None
+    return None
+
+
+def total_count(query, model):
+    """
+    Return (total, strategy used) for an unfiltered list query over `model`.
+    """
+    strategy = request.args.get('count', app.config['COUNT_STRATEGY'])
+    if strategy == 'cached':
+        versions = db.session.get(TableVersion, model.__tablename__)
+        if versions is not None:
+            return versions.row_count, 'cached'
+    elif strategy == 'estimated':
+        estimate = estimate_row_count(model.__tablename__)
+        if estimate is not None:
+            return estimate, 'estimated'
+    return query.count(), 'exact'
+
+
+def list_args(args, allowed_sort):
+    """Return (sort, order, page, per_page) from a list request's query args"""
+    sort = args.get('sort', 'id')
+    order = args.get('order', 'asc')
+    if sort not in allowed_sort:
+        sort = 'id'
+    if order != 'desc':
+        order = 'asc'
+
+    page = args.get('page', 1, type=int)
+    per_page = args.get('per_page', 10, type=int)
+    if page < 1:
+        page = 1
+    if per_page < 1:
+        per_page = 10
+    return sort, order, page, per_page
+
+
 # =============================================================================
 # REST API ROUTES FOR BOOKS
 # =============================================================================
 
 @app.route('/api/books', methods=['GET'])
+@conditional('book')
+@cached('books')
 def get_books():
     query = Book.query
 
-    # Sorting
-    sort = request.args.get('sort', 'id')
-    order = request.args.get('order', 'asc')
-    allowed_sort = {'id', 'title', 'author', 'year', 'isbn', 'created_at'}
-    if sort not in allowed_sort:
-        sort = 'id'
+    # Sorting and pagination
+    sort, order, page, per_page = list_args(request.args, {'id', 'title', 'author', 'year', 'isbn', 'created_at'})
+
+    fields, error = get_fields(Book)
+    if error:
+        return error
+
+    if 'cursor' in request.args:
+        return cursor_response(query, Book, sort, order, per_page, 'books', fields)
 
     sort_col = getattr(Book, sort)
     if order == 'desc':
@@ -84,16 +813,8 @@ def get_books():
     else:
         query = query.order_by(sort_col.asc())
 
-    # Pagination
-    page = request.args.get('page', 1, type=int)
-    per_page = request.args.get('per_page', 10, type=int)
-    if page < 1:
-        page = 1
-    if per_page < 1:
-        per_page = 10
-
-    total = query.count()
-    items = query.offset((page - 1) * per_page).limit(per_page).all()
+    total, count_strategy = total_count(query, Book)
+    items = project(query, Book, fields).offset((page - 1) * per_page).limit(per_page).all()
     total_pages = (total + per_page - 1) // per_page if per_page else 0
 
     return jsonify({
@@ -102,16 +823,23 @@ def get_books():
         'per_page': per_page,
         'total_pages': total_pages,
         'total_items': total,
-        'books': [book.to_dict() for book in items]
+        'count_strategy': count_strategy,
+        'books': rows_to_dicts(items)
     })
 
 
 @app.route('/api/books/<int:id>', methods=['GET'])
+@conditional('book')
+@cached('book:{id}')
 def get_book(id):
-    book = Book.query.get(id)
+    fields, error = get_fields(Book)
+    if error:
+        return error
+
+    book = project(Book.query.filter(Book.id == id), Book, fields).first()
     if not book:
         return jsonify({'success': False, 'error': 'Book not found'}), 404
-    return jsonify({'success': True, 'book': book.to_dict()})
+    return jsonify({'success': True, 'book': book._asdict()})
 
 
 @app.route('/api/books', methods=['POST'])
@@ -147,6 +875,7 @@ def create_book():
 
     db.session.add(new_book)
     db.session.commit()
+    invalidate_books([new_book.id], [author_id])
 
     return jsonify({
         'success': True,
@@ -174,6 +903,7 @@ def update_book(id):
         book.year = data['year']
     if 'isbn' in data:
         book.isbn = data['isbn']
+    old_author_id = book.author_id
     if 'author_id' in data:
         # Verify author exists
         author = Author.query.get(data['author_id'])
@@ -182,6 +912,7 @@ def update_book(id):
         book.author_id = data['author_id']
 
     db.session.commit()
+    invalidate_books([id], [old_author_id, book.author_id])
 
     return jsonify({
         'success': True,
@@ -196,8 +927,10 @@ def delete_book(id):
     if not book:
         return jsonify({'success': False, 'error': 'Book not found'}), 404
 
+    author_id = book.author_id
     db.session.delete(book)
     db.session.commit()
+    invalidate_books([id], [author_id])
 
     return jsonify({
         'success': True,
@@ -210,15 +943,20 @@ def delete_book(id):
 # =============================================================================
 
 @app.route('/api/authors', methods=['GET'])
+@conditional('author', 'book')
+@cached('authors')
 def get_authors():
     query = Author.query
 
-    # Sorting
-    sort = request.args.get('sort', 'id')
-    order = request.args.get('order', 'asc')
-    allowed_sort = {'id', 'name', 'city', 'created_at'}
-    if sort not in allowed_sort:
-        sort = 'id'
+    # Sorting and pagination
+    sort, order, page, per_page = list_args(request.args, {'id', 'name', 'city', 'created_at'})
+
+    fields, error = get_fields(Author)
+    if error:
+        return error
+
+    if 'cursor' in request.args:
+        return cursor_response(query, Author, sort, order, per_page, 'authors', fields)
 
     sort_col = getattr(Author, sort)
     if order == 'desc':
@@ -226,16 +964,8 @@ def get_authors():
     else:
         query = query.order_by(sort_col.asc())
 
-    # Pagination
-    page = request.args.get('page', 1, type=int)
-    per_page = request.args.get('per_page', 10, type=int)
-    if page < 1:
-        page = 1
-    if per_page < 1:
-        per_page = 10
-
-    total = query.count()
-    items = query.offset((page - 1) * per_page).limit(per_page).all()
+    total, count_strategy = total_count(query, Author)
+    items = project(query, Author, fields).offset((page - 1) * per_page).limit(per_page).all()
     total_pages = (total + per_page - 1) // per_page if per_page else 0
 
     return jsonify({
@@ -244,20 +974,28 @@ def get_authors():
         'per_page': per_page,
         'total_pages': total_pages,
         'total_items': total,
-        'authors': [author.to_dict() for author in items]
+        'count_strategy': count_strategy,
+        'authors': rows_to_dicts(items)
     })
 
 
 @app.route('/api/authors/<int:id>', methods=['GET'])
+@conditional('author', 'book')
+@cached('author:{id}')
 def get_author(id):
-    author = Author.query.get(id)
+    fields, error = get_fields(Author)
+    if error:
+        return error
+
+    author = project(Author.query.filter(Author.id == id), Author, fields).first()
     if not author:
         return jsonify({'success': False, 'error': 'Author not found'}), 404
 
+    books = project(Book.query.filter(Book.author_id == id).order_by(Book.id), Book).all()
     return jsonify({
         'success': True,
-        'author': author.to_dict(),
-        'books': [book.to_dict() for book in author.books] if author.books else []
+        'author': author._asdict(),
+        'books': rows_to_dicts(books)
     })
 
 
@@ -279,6 +1017,7 @@ def create_author():
 
     db.session.add(new_author)
     db.session.commit()
+    invalidate_authors()
 
     return jsonify({
         'success': True,
@@ -306,6 +1045,7 @@ def update_author(id):
         author.city = data['city']
 
     db.session.commit()
+    invalidate_authors([id])
 
     return jsonify({
         'success': True,
@@ -320,8 +1060,10 @@ def delete_author(id):
     if not author:
         return jsonify({'success': False, 'error': 'Author not found'}), 404
 
+    book_ids = [book.id for book in author.books]  # deleted with the author
     db.session.delete(author)
     db.session.commit()
+    invalidate_books(book_ids, [id])
 
     return jsonify({
         'success': True,
@@ -332,18 +1074,142 @@ def delete_author(id):
 # =============================================================================
 # SEARCH ENDPOINTS
 # =============================================================================
+#
+# Add ?stream=1 to a search to get newline-delimited JSON (one object per
+# line) instead of one big JSON document. Rows are fetched from the database
+# in batches and written out as they arrive, so memory use stays flat even
+# when exporting the whole catalogue.
+
+STREAM_BATCH_SIZE = 1000
+
+# Text columns are matched through a full-text index instead of
+# ILIKE '%term%' (which has to scan the whole table):
+#   SQLite     -> FTS5 virtual table, kept in sync by triggers
+#   PostgreSQL -> GIN index on to_tsvector(...)
+# Every word in the search box is a prefix match ("pyth cra" finds
+# "Python Crash Course") and results are ordered by relevance.
+# Other databases fall back to ILIKE.
+
+SEARCH_INDEXES = {
+    'book': ('book_fts', ['title', 'author']),
+    'author': ('author_fts', ['name', 'city']),
+}
+
+
+def create_search_indexes(conn, rebuild=True):
+    """
+    Create the full-text indexes on `conn` (safe to run more than once).
+    With rebuild=False an existing SQLite index is left as it is - the
+    triggers keep it up to date - and only a new one is filled.
+    """
+    dialect = conn.dialect.name
+    for table, (fts, columns) in SEARCH_INDEXES.items():
+        cols = ', '.join(columns)
+        new_cols = ', '.join(f'new.{c}' for c in columns)
+        old_cols = ', '.join(f'old.{c}' for c in columns)
+
+        if dialect == 'sqlite':
+            exists = conn.exec_driver_sql(
+                'SELECT 1 FROM sqlite_master WHERE name = ?', (fts,)).first()
+            conn.exec_driver_sql(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5("
+                f"{cols}, content='{table}', content_rowid='id')")
+            conn.exec_driver_sql(
+                f"CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {table} BEGIN "
+                f"INSERT INTO {fts}(rowid, {cols}) VALUES (new.id, {new_cols}); END")
+            conn.exec_driver_sql(
+                f"CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {table} BEGIN "
+                f"INSERT INTO {fts}({fts}, rowid, {cols}) VALUES ('delete', old.id, {old_cols}); END")
+            conn.exec_driver_sql(
+                f"CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE ON {table} BEGIN "
+                f"INSERT INTO {fts}({fts}, rowid, {cols}) VALUES ('delete', old.id, {old_cols}); "
+                f"INSERT INTO {fts}(rowid, {cols}) VALUES (new.id, {new_cols}); END")
+            # Re-index whatever is already in the table
+            if rebuild or not exists:
+                conn.exec_driver_sql(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')")
+        elif dialect == 'postgresql':
+            for col in columns:
+                conn.exec_driver_sql(
+                    f"CREATE INDEX IF NOT EXISTS ix_{table}_{col}_fts ON {table} "
+                    f"USING GIN (to_tsvector('simple', coalesce({col}, '')))")
+
+
+def text_search(query, model, terms, dialect=None):
+    """
+    Filter `query` (a Query or a select()) to rows matching every
+    {column: text} in `terms`, best matches first.
+    """
+    words = {col: re.findall(r'\w+', text) for col, text in terms.items()}
+    dialect = dialect or db.engine.dialect.name
+
+    if dialect == 'sqlite' and all(words.values()):
+        fts = SEARCH_INDEXES[model.__tablename__][0]
+        # e.g. title : ("pyth"* "cra"*) AND author : ("eric"*)
+        match = ' AND '.join(
+            '%s : (%s)' % (col, ' '.join('"%s"*' % w for w in col_words))
+            for col, col_words in words.items()
+        )
+        hits = (db.text(f'SELECT rowid, bm25({fts}) AS rank FROM {fts} WHERE {fts} MATCH :match')
+                .bindparams(match=match)
+                .columns(rowid=db.Integer, rank=db.Float)
+                .subquery())
+        return query.join(hits, hits.c.rowid == model.id).order_by(hits.c.rank, model.id)
+
+    if dialect == 'postgresql' and all(words.values()):
+        rank = 0
+        for col, col_words in words.items():
+            vector = db.func.to_tsvector('simple', db.func.coalesce(getattr(model, col), ''))
+            tsquery = db.func.to_tsquery('simple', ' & '.join(f'{w}:*' for w in col_words))
+            query = query.filter(vector.op('@@')(tsquery))
+            rank = rank + db.func.ts_rank(vector, tsquery)
+        return query.order_by(rank.desc(), model.id)
+
+    for col, text in terms.items():
+        query = query.filter(getattr(model, col).ilike(f'%{text}%'))
+    return query
+
+
+def stream_ndjson(query, model, fields=None):
+    """Stream the rows of `query` as NDJSON, STREAM_BATCH_SIZE rows at a time"""
+    engine = db.engine
+
+    def generate():
+        # Own session: the body is sent after the request's session is
+        # removed, and closing it here returns the connection to the pool
+        # even when the client goes away halfway through
+        session = Session(engine)
+        try:
+            rows = project(query, model, fields).with_session(session).yield_per(STREAM_BATCH_SIZE)
+            chunk = []
+            for row in rows:
+                chunk.append(app.json.dumps(row._asdict()))
+                if len(chunk) >= STREAM_BATCH_SIZE:
+                    yield '\n'.join(chunk) + '\n'
+                    chunk = []
+            if chunk:
+                yield '\n'.join(chunk) + '\n'
+        finally:
+            session.close()
+
+    return Response(generate(), mimetype='application/x-ndjson')
+
 
 @app.route('/api/books/search', methods=['GET'])
 def search_books():
+    fields, error = get_fields(Book)
+    if error:
+        return error
+
     query = Book.query
 
+    terms = {}
     title = request.args.get('q')
     if title:
-        query = query.filter(Book.title.ilike(f'%{title}%'))
+        terms['title'] = title
 
     author = request.args.get('author')
     if author:
-        query = query.filter(Book.author.ilike(f'%{author}%'))
+        terms['author'] = author
 
     year = request.args.get('year')
     if year:
@@ -353,36 +1219,380 @@ def search_books():
     if author_id:
         query = query.filter_by(author_id=int(author_id))
 
-    books = query.all()
+    if terms:
+        query = text_search(query, Book, terms)
+
+    if request.args.get('stream', type=int):
+        return stream_ndjson(query.order_by(Book.id), Book, fields)
+
+    books = project(query, Book, fields).all()
 
     return jsonify({
         'success': True,
         'count': len(books),
-        'books': [book.to_dict() for book in books]
+        'books': rows_to_dicts(books)
     })
 
 
 @app.route('/api/authors/search', methods=['GET'])
 def search_authors():
+    fields, error = get_fields(Author)
+    if error:
+        return error
+
     query = Author.query
 
+    terms = {}
     name = request.args.get('name')
     if name:
-        query = query.filter(Author.name.ilike(f'%{name}%'))
+        terms['name'] = name
 
     city = request.args.get('city')
     if city:
-        query = query.filter(Author.city.ilike(f'%{city}%'))
+        terms['city'] = city
 
-    authors = query.all()
+    if terms:
+        query = text_search(query, Author, terms)
+
+    if request.args.get('stream', type=int):
+        return stream_ndjson(query.order_by(Author.id), Author, fields)
+
+    authors = project(query, Author, fields).all()
 
     return jsonify({
         'success': True,
         'count': len(authors),
-        'authors': [author.to_dict() for author in authors]
+        'authors': rows_to_dicts(authors)
     })
 
 
+# =============================================================================
+# BULK ENDPOINTS
+# =============================================================================
+#
+# POST   /api/books/bulk   [{title, author, ...}, ...]        -> create
+# PUT    /api/books/bulk   [{id, title?, author?, ...}, ...]  -> update
+# DELETE /api/books/bulk   [id, id, ...]                      -> delete
+# (same for /api/authors/bulk)
+#
+# Instead of one request + one commit per row, a whole batch is validated
+# with a handful of set-based queries (WHERE ... IN (...)) and written with
+# a single executemany in one transaction. Items that fail validation are
+# skipped and reported; the rest are saved. Each result has the index of
+# the item in the request so the client can match them up.
+
+BULK_MAX_ITEMS = 1000
+
+BOOK_FIELDS = ('title', 'author', 'year', 'isbn', 'author_id')
+AUTHOR_FIELDS = ('name', 'bio', 'city')
+
+
+def bulk_items_error(items):
+    """Why a bulk request body can't be processed, or None if it can"""
+    if not isinstance(items, list) or not items:
+        return 'Expected a non-empty JSON array'
+    if len(items) > BULK_MAX_ITEMS:
+        return f'At most {BULK_MAX_ITEMS} items per request'
+    return None
+
+
+def get_bulk_items():
+    """Return (items, None) or (None, error response) for a bulk request"""
+    items = request.get_json(silent=True)
+    error = bulk_items_error(items)
+    if error:
+        return None, (jsonify({'success': False, 'error': error}), 400)
+    return items, None
+
+
+def bulk_summary(results):
+    ok = sum(1 for r in results if r['success'])
+    return {
+        'success': ok == len(results),
+        'succeeded': ok,
+        'failed': len(results) - ok,
+        'results': results
+    }
+
+
+def bulk_response(results, status=200):
+    return jsonify(bulk_summary(results)), status
+
+
+def item_values(items, key):
+    """`key` of every object in a bulk request (non-objects are skipped)"""
+    return [i.get(key) for i in items if isinstance(i, dict)]
+
+
+def is_id(value):
+    """An integer id from JSON (true and false are ints in Python, but not ids)"""
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+# The check_* functions below only look at the request and at the sets the
+# view loaded for the whole batch; they don't touch the database.
+
+def book_fields_error(data, new):
+    """
+    What is wrong with the fields of one bulk book item, or None. A new
+    book needs a title and an author; an update only checks what it sends.
+    """
+    for field in ('title', 'author'):
+        if (new or field in data) and not (isinstance(data.get(field), str) and data[field]):
+            return 'Title and author are required'
+    if data.get('year') is not None and not is_id(data['year']):
+        return 'Year must be an integer'
+    if data.get('isbn') is not None and not isinstance(data['isbn'], str):
+        return 'ISBN must be a string'
+    if data.get('author_id') is not None and not is_id(data['author_id']):
+        return 'Author id must be an integer'
+    return None
+
+
+def author_fields_error(data, new):
+    """What is wrong with the fields of one bulk author item, or None"""
+    if (new or 'name' in data) and not (isinstance(data.get('name'), str) and data['name']):
+        return 'Name is required'
+    for field in ('bio', 'city'):
+        if data.get(field) is not None and not isinstance(data[field], str):
+            return f'{field.capitalize()} must be a string'
+    return None
+
+
+def check_new_books(items, authors, isbns):
+    """
+    Validate books to create against the existing author ids and isbns.
+    Returns (results, rows, positions): rows to insert, the index of each
+    in `items`, and results with the failures filled in.
+    """
+    results = [None] * len(items)
+    rows, positions = [], []
+    for index, data in enumerate(items):
+        if isinstance(data, dict):
+            error = book_fields_error(data, new=True)
+        else:
+            error = 'Title and author are required'
+        if error:
+            results[index] = {'index': index, 'success': False, 'error': error}
+        elif data.get('isbn') and data['isbn'] in isbns:
+            results[index] = {'index': index, 'success': False, 'error': 'ISBN already exists'}
+        elif data.get('author_id') is not None and data['author_id'] not in authors:
+            results[index] = {'index': index, 'success': False, 'error': 'Author not found'}
+        else:
+            if data.get('isbn'):
+                isbns[data['isbn']] = None  # catch duplicates later in the batch
+            rows.append({field: data.get(field) for field in BOOK_FIELDS})
+            positions.append(index)
+    return results, rows, positions
+
+
+def check_book_updates(items, books, authors, isbns):
+    """Validate book updates. Returns (results, rows to update)"""
+    results = []
+    rows = []
+    for index, data in enumerate(items):
+        if not isinstance(data, dict) or not is_id(data.get('id')) or data['id'] not in books:
+            results.append({'index': index, 'success': False, 'error': 'Book not found'})
+            continue
+        error = book_fields_error(data, new=False)
+        if error:
+            results.append({'index': index, 'success': False, 'error': error})
+            continue
+        if data.get('isbn') and isbns.get(data['isbn'], data['id']) != data['id']:
+            results.append({'index': index, 'success': False, 'error': 'ISBN already exists'})
+            continue
+        if data.get('author_id') is not None and data['author_id'] not in authors:
+            results.append({'index': index, 'success': False, 'error': 'Author not found'})
+            continue
+
+        if data.get('isbn'):
+            isbns[data['isbn']] = data['id']
+        row = {field: data[field] for field in BOOK_FIELDS if field in data}
+        row['id'] = data['id']
+        rows.append(row)
+        results.append({'index': index, 'success': True, 'id': data['id']})
+    return results, rows
+
+
+def check_new_authors(items):
+    """Validate authors to create. Returns (results, rows, positions)"""
+    results = [None] * len(items)
+    rows, positions = [], []
+    for index, data in enumerate(items):
+        error = author_fields_error(data, new=True) if isinstance(data, dict) else 'Name is required'
+        if error:
+            results[index] = {'index': index, 'success': False, 'error': error}
+        else:
+            rows.append({field: data.get(field) for field in AUTHOR_FIELDS})
+            positions.append(index)
+    return results, rows, positions
+
+
+def check_author_updates(items, authors):
+    """Validate author updates. Returns (results, rows to update)"""
+    results = []
+    rows = []
+    for index, data in enumerate(items):
+        if not isinstance(data, dict) or not is_id(data.get('id')) or data['id'] not in authors:
+            results.append({'index': index, 'success': False, 'error': 'Author not found'})
+            continue
+        error = author_fields_error(data, new=False)
+        if error:
+            results.append({'index': index, 'success': False, 'error': error})
+            continue
+
+        row = {field: data[field] for field in AUTHOR_FIELDS if field in data}
+        row['id'] = data['id']
+        rows.append(row)
+        results.append({'index': index, 'success': True, 'id': data['id']})
+    return results, rows
+
+
+def deleted_results(ids, found, error):
+    return [
+        {'index': index, 'success': True, 'id': id} if is_id(id) and id in found
+        else {'index': index, 'success': False, 'error': error}
+        for index, id in enumerate(ids)
+    ]
+
+
+def existing_ids(model, ids):
+    """Which of `ids` exist in the table - one query for the whole batch"""
+    ids = {i for i in ids if is_id(i)}
+    if not ids:
+        return set()
+    return {row[0] for row in db.session.query(model.id).filter(model.id.in_(ids))}
+
+
+def taken_isbns(isbns):
+    """Map isbn -> book id for every isbn in `isbns` already in the table"""
+    isbns = {i for i in isbns if isinstance(i, str) and i}  # the rest fail validation
+    if not isbns:
+        return {}
+    return dict(db.session.query(Book.isbn, Book.id).filter(Book.isbn.in_(isbns)))
+
+
+def insert_rows(model, rows):
+    """executemany INSERT for `rows`, returning the new ids in order"""
+    if not rows:
+        return []
+    result = db.session.execute(
+        db.insert(model).returning(model.id, sort_by_parameter_order=True), rows)
+    return list(result.scalars())
+
+
+@app.route('/api/books/bulk', methods=['POST'])
+def bulk_create_books():
+    items, error = get_bulk_items()
+    if error:
+        return error
+
+    authors = existing_ids(Author, item_values(items, 'author_id'))
+    isbns = taken_isbns(item_values(items, 'isbn'))
+    results, rows, positions = check_new_books(items, authors, isbns)
+
+    new_ids = insert_rows(Book, rows)
+    for index, new_id in zip(positions, new_ids):
+        results[index] = {'index': index, 'success': True, 'id': new_id}
+    db.session.commit()
+    if rows:
+        invalidate_books(new_ids, {row['author_id'] for row in rows})
+
+    return bulk_response(results, 201 if rows else 200)
+
+
+@app.route('/api/books/bulk', methods=['PUT'])
+def bulk_update_books():
+    items, error = get_bulk_items()
+    if error:
+        return error
+
+    books = existing_ids(Book, item_values(items, 'id'))
+    authors = existing_ids(Author, item_values(items, 'author_id'))
+    isbns = taken_isbns(item_values(items, 'isbn'))
+    results, rows = check_book_updates(items, books, authors, isbns)
+
+    if rows:
+        ids = [row['id'] for row in rows]
+        old_author_ids = {a for (a,) in db.session.query(Book.author_id)
+                          .filter(Book.id.in_(ids)).distinct()}
+        db.session.execute(db.update(Book), rows)
+    db.session.commit()
+    if rows:
+        invalidate_books(ids, old_author_ids | {row.get('author_id') for row in rows})
+
+    return bulk_response(results)
+
+
+@app.route('/api/books/bulk', methods=['DELETE'])
+def bulk_delete_books():
+    ids, error = get_bulk_items()
+    if error:
+        return error
+
+    found = existing_ids(Book, ids)
+    author_ids = {a for (a,) in db.session.query(Book.author_id)
+                  .filter(Book.id.in_(found)).distinct()}
+    Book.query.filter(Book.id.in_(found)).delete(synchronize_session=False)
+    db.session.commit()
+    if found:
+        invalidate_books(found, author_ids)
+
+    return bulk_response(deleted_results(ids, found, 'Book not found'))
+
+
+@app.route('/api/authors/bulk', methods=['POST'])
+def bulk_create_authors():
+    items, error = get_bulk_items()
+    if error:
+        return error
+
+    results, rows, positions = check_new_authors(items)
+    for index, new_id in zip(positions, insert_rows(Author, rows)):
+        results[index] = {'index': index, 'success': True, 'id': new_id}
+    db.session.commit()
+    if rows:
+        invalidate_authors()
+
+    return bulk_response(results, 201 if rows else 200)
+
+
+@app.route('/api/authors/bulk', methods=['PUT'])
+def bulk_update_authors():
+    items, error = get_bulk_items()
+    if error:
+        return error
+
+    authors = existing_ids(Author, item_values(items, 'id'))
+    results, rows = check_author_updates(items, authors)
+
+    if rows:
+        db.session.execute(db.update(Author), rows)
+    db.session.commit()
+    if rows:
+        invalidate_authors(row['id'] for row in rows)
+
+    return bulk_response(results)
+
+
+@app.route('/api/authors/bulk', methods=['DELETE'])
+def bulk_delete_authors():
+    ids, error = get_bulk_items()
+    if error:
+        return error
+
+    found = existing_ids(Author, ids)
+    book_ids = [b for (b,) in db.session.query(Book.id).filter(Book.author_id.in_(found))]
+    # Same effect as the cascade='all, delete-orphan' on Author.books
+    Book.query.filter(Book.author_id.in_(found)).delete(synchronize_session=False)
+    Author.query.filter(Author.id.in_(found)).delete(synchronize_session=False)
+    db.session.commit()
+    if found:
+        invalidate_books(book_ids, found)
+
+    return bulk_response(deleted_results(ids, found, 'Author not found'))
+
+
 # =============================================================================
 # MAIN ROUTE
 # =============================================================================
@@ -395,6 +1605,48 @@ def index():
 # =============================================================================
 # DATABASE INITIALIZATION - UPDATED TO FIX ERROR
 # =============================================================================
+#
+# init_db() (run by `python app.py`) starts over with the sample data.
+# `flask run` doesn't call it, so at startup create_missing_schema() adds
+# whatever an existing database is missing - tables, indexes, the full-text
+# indexes and the table_version rows - and leaves the data alone.
+
+def create_missing_schema(conn):
+    """Bring the database on `conn` up to the current models (safe to run more than once)"""
+    db.metadata.create_all(conn)  # skips tables that already exist
+    for table in db.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(conn, checkfirst=True)
+    create_search_indexes(conn, rebuild=False)
+
+    versions = TableVersion.__table__
+    known = set(conn.execute(db.select(versions.c.name)).scalars())
+    for model in (Author, Book):
+        name = model.__tablename__
+        if name not in known:
+            row_count = conn.execute(db.select(db.func.count()).select_from(model.__table__)).scalar()
+            conn.execute(db.insert(versions).values(name=name, version=0, row_count=row_count,
+                                                    updated_at=datetime.utcnow()))
+
+
+def sample_authors():
+    return [
+        Author(name='Eric Matthes', city='Portland', bio='Author of Python Crash Course'),
+        Author(name='Miguel Grinberg', city='Portland', bio='Flask expert and author'),
+        Author(name='Robert C. Martin', city='New York', bio='Clean Code author and software engineer'),
+    ]
+
+
+def sample_books(authors):
+    return [
+        Book(title='Python Crash Course', author='Eric Matthes', year=2019, 
+             isbn='978-1593279288', author_id=authors[0].id),
+        Book(title='Flask Web Development', author='Miguel Grinberg', year=2018, 
+             isbn='978-1491991732', author_id=authors[1].id),
+        Book(title='Clean Code', author='Robert C. Martin', year=2008, 
+             isbn='978-0132350884', author_id=authors[2].id),
+    ]
+
 
 def init_db():
     with app.app_context():
@@ -402,32 +1654,32 @@ def init_db():
         db.drop_all()
         # Create fresh tables with current schema
         db.create_all()
+        with db.engine.begin() as conn:
+            create_search_indexes(conn)
+        db.session.add_all([TableVersion(name='author'), TableVersion(name='book')])
+        db.session.commit()
 
         # Create sample authors
-        sample_authors = [
-            Author(name='Eric Matthes', city='Portland', bio='Author of Python Crash Course'),
-            Author(name='Miguel Grinberg', city='Portland', bio='Flask expert and author'),
-            Author(name='Robert C. Martin', city='New York', bio='Clean Code author and software engineer'),
-        ]
-        db.session.add_all(sample_authors)
+        db.session.add_all(sample_authors())
         db.session.commit()
         print('Sample authors added!')
 
         # Create sample books
-        authors = Author.query.all()
-        
-        sample_books = [
-            Book(title='Python Crash Course', author='Eric Matthes', year=2019, 
-                 isbn='978-1593279288', author_id=authors[0].id),
-            Book(title='Flask Web Development', author='Miguel Grinberg', year=2018, 
-                 isbn='978-1491991732', author_id=authors[1].id),
-            Book(title='Clean Code', author='Robert C. Martin', year=2008, 
-                 isbn='978-0132350884', author_id=authors[2].id),
-        ]
-        db.session.add_all(sample_books)
+        authors = Author.query.order_by(Author.id).all()
+        db.session.add_all(sample_books(authors))
         db.session.commit()
         print('Sample books added!')
 
+        # Planner statistics, used by ?count=estimated
+        if db.engine.dialect.name == 'sqlite':
+            db.session.execute(db.text('ANALYZE'))
+            db.session.commit()
+
+
+with app.app_context():
+    with db.engine.begin() as conn:
+        create_missing_schema(conn)
+
 
 if __name__ == '__main__':
     init_db()
@@ -0,0 +1,399 @@
+// ==========================================
+//  STATE MANAGEMENT
+// ==========================================
+let currentBookPage = 1;
+let currentAuthorPage = 1;
+let apiCallCount = 0;
+
+// ==========================================
+//  UI INTERACTIONS
+// ==========================================
+function switchTab(tabName) {
+    // Hide all tabs
+    document.querySelectorAll('.tab-content').forEach(tab => {
+        tab.classList.add('hidden');
+    });
+    document.getElementById(`${tabName}-tab`).classList.remove('hidden');
+
+    // Update Nav
+    document.querySelectorAll('.nav-link').forEach(btn => {
+        btn.classList.remove('active');
+    });
+    event.currentTarget.classList.add('active');
+
+    // Load data
+    if (tabName === 'books') loadBooks();
+    if (tabName === 'authors') loadAuthors();
+}
+
+function trackApiCall() {
+    apiCallCount++;
+    document.getElementById('apiCalls').textContent = apiCallCount;
+}
+
+function showMessage(elementId, message, type = 'success') {
+    const element = document.getElementById(elementId);
+    const className = type === 'success' ? 'alert-success' : (type === 'error' ? 'alert-error' : 'alert-info');
+    const icon = type === 'success' ? 'check-circle' : (type === 'error' ? 'exclamation-circle' : 'info-circle');
+
+    element.innerHTML = `
+        <div class="alert ${className}">
+            <i class="fas fa-${icon}"></i>
+            ${message}
+        </div>
+    `;
+    setTimeout(() => {
+        element.innerHTML = '';
+    }, 5000);
+}
+
+// ==========================================
+//  BOOKS LOGIC
+// ==========================================
+async function loadBooks(page = 1) {
+    currentBookPage = page;
+    const sort = document.getElementById('bookSort').value;
+    const order = document.getElementById('bookOrder').value;
+    const tbody = document.getElementById('booksList');
+
+    tbody.innerHTML = '<tr><td colspan="5" style="text-align:center; padding:20px; color:var(--text-secondary);">Loading...</td></tr>';
+
+    try {
+        const response = await fetch(`/api/books?page=${page}&per_page=6&sort=${sort}&order=${order}`);
+        trackApiCall();
+        const data = await response.json();
+
+        if (data.success) {
+            document.getElementById('booksCount').textContent = data.total_items;
+
+            if (data.books.length === 0) {
+                tbody.innerHTML = '<tr><td colspan="5" style="text-align:center; padding:20px;">No books found.</td></tr>';
+            } else {
+                tbody.innerHTML = data.books.map(book => `
+                    <tr>
+                        <td><span class="badge badge-gray">#${book.id}</span></td>
+                        <td style="font-weight:500;">${book.title}</td>
+                        <td>${book.author}</td>
+                        <td>${book.year || '-'}</td>
+                        <td class="text-right">
+                            <button class="btn-icon" onclick="editBook(${book.id})" title="Edit"><i class="fas fa-edit"></i></button>
+                            <button class="btn-icon" style="color:var(--error);" onclick="deleteBook(${book.id})" title="Delete"><i class="fas fa-trash"></i></button>
+                        </td>
+                    </tr>
+                `).join('');
+            }
+            renderPagination('bookPagination', data.page, data.total_pages, 'loadBooks');
+            loadAuthorsForSelect();
+        }
+    } catch (error) {
+        tbody.innerHTML = `<tr><td colspan="5" style="color:var(--error);">Error: ${error.message}</td></tr>`;
+    }
+}
+
+async function createBook() {
+    const title = document.getElementById('bookTitle').value.trim();
+    const author = document.getElementById('bookAuthor').value.trim();
+    const year = document.getElementById('bookYear').value;
+    const isbn = document.getElementById('bookIsbn').value.trim();
+    const authorId = document.getElementById('bookAuthorId').value;
+
+    if (!title || !author) {
+        showMessage('bookMessage', 'Title and Author are required', 'error');
+        return;
+    }
+
+    try {
+        const response = await fetch('/api/books', {
+            method: 'POST',
+            headers: {'Content-Type': 'application/json'},
+            body: JSON.stringify({
+                title, author, year: year || null, isbn: isbn || null, author_id: authorId || null
+            })
+        });
+        trackApiCall();
+        const data = await response.json();
+
+        if (data.success) {
+            showMessage('bookMessage', 'Book added successfully', 'success');
+            // Reset form
+            ['bookTitle', 'bookAuthor', 'bookYear', 'bookIsbn', 'bookAuthorId'].forEach(id => document.getElementById(id).value = '');
+            loadBooks(currentBookPage);
+        } else {
+            showMessage('bookMessage', data.error, 'error');
+        }
+    } catch (error) {
+        showMessage('bookMessage', error.message, 'error');
+    }
+}
+
+async function editBook(id) {
+    // Simplified edit for demo - normally would open modal
+    const newTitle = prompt('Enter new title:');
+    if (newTitle === null) return; // Cancelled
+
+    const updateData = {};
+    if (newTitle) updateData.title = newTitle;
+
+    // Allow editing other fields via subsequent prompts or a real modal in prod
+    // For now, minimal implementation to satisfy existing logic pattern
+
+    try {
+        const response = await fetch(`/api/books/${id}`, {
+            method: 'PUT',
+            headers: {'Content-Type': 'application/json'},
+            body: JSON.stringify(updateData)
+        });
+        trackApiCall();
+        const data = await response.json();
+        if(data.success) loadBooks(currentBookPage);
+    } catch(e) { alert(e.message); }
+}
+
+async function deleteBook(id) {
+    if(!confirm('Delete this book?')) return;
+    try {
+        const response = await fetch(`/api/books/${id}`, { method: 'DELETE' });
+        trackApiCall();
+        if((await response.json()).success) {
+            loadBooks(currentBookPage);
+            showMessage('bookMessage', 'Book deleted', 'success');
+        }
+    } catch(e) { alert(e.message); }
+}
+
+// ==========================================
+//  AUTHORS LOGIC
+// ==========================================
+async function loadAuthors(page = 1) {
+    currentAuthorPage = page;
+    const tbody = document.getElementById('authorsList');
+    tbody.innerHTML = '<tr><td colspan="5" style="text-align:center; padding:20px; color:var(--text-secondary);">Loading...</td></tr>';
+
+    try {
+        const response = await fetch(`/api/authors?page=${page}&per_page=6`);
+        trackApiCall();
+        const data = await response.json();
+
+        if (data.success) {
+            document.getElementById('authorsCount').textContent = data.total_items;
+
+            if (data.authors.length === 0) {
+                tbody.innerHTML = '<tr><td colspan="5" style="text-align:center; padding:20px;">No authors found.</td></tr>';
+            } else {
+                tbody.innerHTML = data.authors.map(author => `
+                    <tr>
+                        <td><span class="badge badge-gray">#${author.id}</span></td>
+                        <td style="font-weight:500;">${author.name}</td>
+                        <td>${author.city || '-'}</td>
+                        <td><span class="badge badge-blue">${author.books_count} books</span></td>
+                        <td class="text-right">
+                            <button class="btn-icon" onclick="viewAuthor(${author.id})" title="View"><i class="fas fa-eye"></i></button>
+                            <button class="btn-icon" onclick="editAuthor(${author.id})" title="Edit"><i class="fas fa-edit"></i></button>
+                            <button class="btn-icon" style="color:var(--error);" onclick="deleteAuthor(${author.id})" title="Delete"><i class="fas fa-trash"></i></button>
+                        </td>
+                    </tr>
+                `).join('');
+            }
+            renderPagination('authorPagination', data.page, data.total_pages, 'loadAuthors');
+        }
+    } catch (error) {
+        tbody.innerHTML = `<tr><td colspan="5" style="color:var(--error);">Error: ${error.message}</td></tr>`;
+    }
+}
+
+async function createAuthor() {
+    const name = document.getElementById('authorName').value.trim();
+    const city = document.getElementById('authorCity').value.trim();
+    const bio = document.getElementById('authorBio').value.trim();
+
+    if (!name) {
+        showMessage('authorMessage', 'Name is required', 'error');
+        return;
+    }
+
+    try {
+        const response = await fetch('/api/authors', {
+            method: 'POST',
+            headers: {'Content-Type': 'application/json'},
+            body: JSON.stringify({ name, city, bio })
+        });
+        trackApiCall();
+        const data = await response.json();
+
+        if (data.success) {
+            showMessage('authorMessage', 'Author created', 'success');
+            ['authorName', 'authorCity', 'authorBio'].forEach(id => document.getElementById(id).value = '');
+            loadAuthors(currentAuthorPage);
+            loadAuthorsForSelect();
+        } else {
+            showMessage('authorMessage', data.error, 'error');
+        }
+    } catch (error) {
+        showMessage('authorMessage', error.message, 'error');
+    }
+}
+
+async function loadAuthorsForSelect() {
+    try {
+        const response = await fetch('/api/authors');
+        const data = await response.json();
+        if(data.success) {
+            const select = document.getElementById('bookAuthorId');
+            select.innerHTML = '<option value="">Select an author...</option>';
+            data.authors.forEach(a => {
+                const opt = document.createElement('option');
+                opt.value = a.id;
+                opt.textContent = `${a.name}`;
+                select.appendChild(opt);
+            });
+        }
+    } catch(e) { console.error(e); }
+}
+
+async function viewAuthor(id) {
+    try {
+        const response = await fetch(`/api/authors/${id}`);
+        const data = await response.json();
+        if(data.success) {
+            const a = data.author;
+            alert(`Author: ${a.name}\nCity: ${a.city || 'N/A'}\nBio: ${a.bio || 'N/A'}\nBooks: ${data.books.length}`);
+        }
+    } catch(e) { alert(e.message); }
+}
+
+async function editAuthor(id) {
+    const newName = prompt('Enter new name:');
+    if(!newName) return;
+
+    try {
+        const response = await fetch(`/api/authors/${id}`, {
+            method: 'PUT',
+            headers: {'Content-Type': 'application/json'},
+            body: JSON.stringify({ name: newName })
+        });
+        trackApiCall();
+        if((await response.json()).success) loadAuthors(currentAuthorPage);
+    } catch(e) { alert(e.message); }
+}
+
+async function deleteAuthor(id) {
+    if(!confirm('Delete author?')) return;
+    try {
+        const response = await fetch(`/api/authors/${id}`, { method: 'DELETE' });
+        trackApiCall();
+        if((await response.json()).success) {
+            loadAuthors(currentAuthorPage);
+            showMessage('authorMessage', 'Author deleted', 'success');
+        }
+    } catch(e) { alert(e.message); }
+}
+
+// ==========================================
+//  SEARCH LOGIC
+// ==========================================
+async function searchBooks() {
+    const params = new URLSearchParams();
+    const title = document.getElementById('searchTitle').value;
+    const author = document.getElementById('searchAuthor').value;
+    const year = document.getElementById('searchYear').value;
+    const authorId = document.getElementById('searchAuthorId').value;
+
+    if(title) params.append('q', title);
+    if(author) params.append('author', author);
+    if(year) params.append('year', year);
+    if(authorId) params.append('author_id', authorId);
+
+    if(!params.toString()) {
+        showMessage('searchBookResults', 'Enter search criteria', 'error');
+        return;
+    }
+
+    try {
+        const response = await fetch(`/api/books/search?${params}`);
+        trackApiCall();
+        const data = await response.json();
+        const container = document.getElementById('searchBookResults');
+
+        if(data.success) {
+            let html = `<div class="alert alert-success">Found ${data.count} books</div>`;
+            if(data.count > 0) {
+                html += '<table><thead><tr><th>ID</th><th>Title</th><th>Author</th><th>Year</th></tr></thead><tbody>';
+                data.books.forEach(b => {
+                    html += `<tr><td>${b.id}</td><td><b>${b.title}</b></td><td>${b.author}</td><td>${b.year || '-'}</td></tr>`;
+                });
+                html += '</tbody></table>';
+            }
+            container.innerHTML = html;
+        }
+    } catch(e) { showMessage('searchBookResults', e.message, 'error'); }
+}
+
+async function searchAuthors() {
+    const params = new URLSearchParams();
+    const name = document.getElementById('searchAuthorName').value;
+    const city = document.getElementById('searchAuthorCity').value;
+
+    if(name) params.append('name', name);
+    if(city) params.append('city', city);
+
+    if(!params.toString()) {
+        showMessage('searchAuthorResults', 'Enter search criteria', 'error');
+        return;
+    }
+
+    try {
+        const response = await fetch(`/api/authors/search?${params}`);
+        trackApiCall();
+        const data = await response.json();
+        const container = document.getElementById('searchAuthorResults');
+
+        if(data.success) {
+            let html = `<div class="alert alert-success">Found ${data.count} authors</div>`;
+            if(data.count > 0) {
+                html += '<table><thead><tr><th>ID</th><th>Name</th><th>City</th><th>Books</th></tr></thead><tbody>';
+                data.authors.forEach(a => {
+                    html += `<tr><td>${a.id}</td><td><b>${a.name}</b></td><td>${a.city || '-'}</td><td>${a.books_count}</td></tr>`;
+                });
+                html += '</tbody></table>';
+            }
+            container.innerHTML = html;
+        }
+    } catch(e) { showMessage('searchAuthorResults', e.message, 'error'); }
+}
+
+// ==========================================
+//  PAGINATION
+// ==========================================
+function renderPagination(elementId, currentPage, totalPages, callbackName) {
+    const container = document.getElementById(elementId);
+    if (totalPages <= 1) {
+        container.innerHTML = '';
+        return;
+    }
+
+    let html = `
+        <button class="page-btn" ${currentPage === 1 ? 'disabled' : ''} onclick="${callbackName}(${currentPage - 1})">
+            <i class="fas fa-chevron-left"></i>
+        </button>
+    `;
+
+    for (let i = 1; i <= totalPages; i++) {
+        // Simple pagination logic: show all for now, or limit if too many
+        if (totalPages > 7 && Math.abs(currentPage - i) > 2 && i !== 1 && i !== totalPages) continue;
+         html += `<button class="page-btn ${i === currentPage ? 'active' : ''}" onclick="${callbackName}(${i})">${i}</button>`;
+    }
+
+    html += `
+        <button class="page-btn" ${currentPage === totalPages ? 'disabled' : ''} onclick="${callbackName}(${currentPage + 1})">
+            <i class="fas fa-chevron-right"></i>
+        </button>
+    `;
+
+    container.innerHTML = html;
+}
+
+// Init
+document.addEventListener('DOMContentLoaded', () => {
+    loadBooks();
+    loadAuthors();
+});
@@ -14,11 +14,30 @@ Prerequisites: Complete all previous parts
 Install: pip install psycopg2-binary pymysql python-dotenv
 """
 
+import itertools
 import os
-from flask import Flask, render_template, request, redirect, url_for, flash
+import sys
+import time
+from functools import wraps
+from flask import (Flask, render_template, request, redirect, url_for, flash, g, jsonify, has_request_context,
+                   session)
 from flask_sqlalchemy import SQLAlchemy
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import NullPool, QueuePool, StaticPool
 from dotenv import load_dotenv  # Load .env file
 
+# The helpers shared by all parts live in ../shared
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+from shared.compression import init_compression
+from shared.instrumentation import init_sql_instrumentation, instrument_engine
+from shared.metrics import init_metrics, init_pool_metrics, pool_checkout_stats
+from shared.sqlite import use_sqlite_pragmas
+from shared.templates import init_template_cache
+
 # Load environment variables from .env file
 load_dotenv()
 
@@ -36,14 +55,258 @@ DATABASE_URL = os.getenv('DATABASE_URL', 'sqlite:///default.db')
 app.config['SQLALCHEMY_DATABASE_URI'] = DATABASE_URL
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 
-# Connection pool settings (for production)
-app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {
-    'pool_size': 10,  # Number of connections to keep open
-    'pool_recycle': 3600,  # Recycle connections after 1 hour
-    'pool_pre_ping': True,  # Check connection validity before using
-}
+# Connection pool settings, picked for the kind of database in DATABASE_URL.
+# Every value can be overridden from the environment (see ENVIRONMENT
+# VARIABLES at the bottom of this file).
+#
+#   SQLite      A file database keeps a small QueuePool: opening a new
+#               connection re-runs the PRAGMAs below, which costs more than
+#               the query on small pages. Local files never drop a
+#               connection, so there is no pre-ping and no recycling.
+#               DB_POOL_CLASS=null opens a connection per checkout instead.
+#               :memory: shares a single connection (StaticPool), because
+#               every new connection would be a new, empty database.
+#   PostgreSQL, A QueuePool sized for the app's worker threads. Checkouts are
+#   MySQL       LIFO, so the busy connections get reused and the spare ones
+#               can time out on the server. Connections are recycled before
+#               the server's idle timeout closes them (MySQL: 8 hours).
+#
+# Dropped connections are handled optimistically: when a query fails because
+# the server went away, SQLAlchemy throws away the pooled connections and the
+# next checkout reconnects, so only that one request fails.
+# DB_POOL_PRE_PING=true handles them pessimistically instead: every checkout
+# first sends a ping, which costs one extra round trip per request.
+
+
+def env_bool(name, default):
+    value = os.getenv(name)
+    return default if value is None else value.lower() in ('1', 'true', 'yes', 'on')
+
+
+POOL_CLASSES = {'queue': QueuePool, 'null': NullPool, 'static': StaticPool}
+
+
+def pool_options(database_url):
+    """SQLALCHEMY_ENGINE_OPTIONS for a database URL"""
+    url = make_url(database_url)
+    sqlite = url.get_backend_name() == 'sqlite'
+    if sqlite and (url.database in (None, '', ':memory:') or url.query.get('mode') == 'memory'):
+        default_pool = 'static'
+    else:
+        default_pool = 'queue'
+
+    pool = os.getenv('DB_POOL_CLASS', default_pool)
+    if pool not in POOL_CLASSES:
+        raise ValueError(f"DB_POOL_CLASS must be one of {', '.join(sorted(POOL_CLASSES))}, not {pool!r}")
+    options = {'poolclass': POOL_CLASSES[pool]}
+    if pool == 'static' and sqlite:
+        options['connect_args'] = {'check_same_thread': False}  # shared by all threads
+    elif pool == 'queue':
+        options.update({
+            'pool_size': int(os.getenv('DB_POOL_SIZE', '5' if sqlite else '10')),  # kept open
+            'max_overflow': int(os.getenv('DB_MAX_OVERFLOW', '10')),    # extra ones under load
+            'pool_timeout': float(os.getenv('DB_POOL_TIMEOUT', '30')),  # seconds to wait for one
+            'pool_recycle': int(os.getenv('DB_POOL_RECYCLE', '-1' if sqlite else '3600')),  # -1: never
+            'pool_use_lifo': env_bool('DB_POOL_USE_LIFO', True),
+            'pool_pre_ping': env_bool('DB_POOL_PRE_PING', False),
+        })
+    return options
+
+
+app.config['SQLALCHEMY_ENGINE_OPTIONS'] = pool_options(DATABASE_URL)
+
+# Optional read replicas, comma separated (see READ REPLICAS below)
+REPLICA_URLS = [url.strip() for url in os.getenv('DATABASE_REPLICA_URLS', '').split(',') if url.strip()]
+REPLICA_BINDS = [f'replica{i}' for i in range(len(REPLICA_URLS))]
+app.config['SQLALCHEMY_BINDS'] = {key: {'url': url, **pool_options(url)}
+                                  for key, url in zip(REPLICA_BINDS, REPLICA_URLS)}
+app.config['REPLICA_STICKY_SECONDS'] = float(os.getenv('REPLICA_STICKY_SECONDS', '5'))
+
+
+class RoutingSession(Session):
+    """db.session that runs the queries of read-only requests on a replica"""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and not self._flushing and use_replica():
+            return replica_for_request()
+        return super().get_bind(mapper, clause, bind, **kwargs)
+
+
+db = SQLAlchemy(app, session_options={'class_': RoutingSession})
+
+# =============================================================================
+# TEMPLATE CACHE
+# =============================================================================
+# Templates can be compiled before the first request, see shared/templates.py.
+
+app.config['TEMPLATE_CACHE_DIR'] = os.getenv('TEMPLATE_CACHE_DIR')
+app.config['PRECOMPILE_TEMPLATES'] = env_bool('PRECOMPILE_TEMPLATES', False)
+init_template_cache(app)
+
+
+# =============================================================================
+# RESPONSE COMPRESSION
+# =============================================================================
+# Text responses are sent gzip/brotli compressed, see shared/compression.py.
+
+app.config['COMPRESS_MIN_SIZE'] = int(os.getenv('COMPRESS_MIN_SIZE', '500'))   # bytes
+app.config['COMPRESS_LEVEL'] = int(os.getenv('COMPRESS_LEVEL', '6'))            # gzip: 1-9
+app.config['COMPRESS_BR_QUALITY'] = int(os.getenv('COMPRESS_BR_QUALITY', '4'))  # brotli: 0-11
+init_compression(app)
+
+
+# =============================================================================
+# SQLITE TUNING
+# =============================================================================
+# Every new SQLite connection runs SQLITE_PRAGMAS (WAL mode etc.), see shared/sqlite.py.
+
+with app.app_context():
+    for engine in db.engines.values():
+        use_sqlite_pragmas(engine)
+
+
+# =============================================================================
+# SQL INSTRUMENTATION
+# =============================================================================
+# Every statement is timed for Server-Timing and /metrics, see shared/instrumentation.py.
+
+# Threshold for the slow query log, in milliseconds
+app.config['SLOW_QUERY_MS'] = float(os.getenv('SLOW_QUERY_MS', '100'))
+init_sql_instrumentation(app, metrics_route=False)  # /metrics is below (shared/metrics.py)
+
+with app.app_context():
+    for engine in db.engines.values():
+        instrument_engine(engine)
+
+
+# =============================================================================
+# PROMETHEUS METRICS
+# =============================================================================
+# GET /metrics returns request, SQL and connection pool metrics in the
+# Prometheus text format (see shared/metrics.py for the list), plus
+# db_replica_requests_total (see READ REPLICAS), and /metrics?format=json
+# the SQL totals per endpoint.
+
+def engine_name(key):
+    """The name of the engine for a bind key: "primary" or "replica0", "replica1"..."""
+    return 'primary' if key is None else key
+
 
-db = SQLAlchemy(app)
+metrics_registry = init_metrics(app)
+metrics_registry.counter('db_replica_requests_total', 'Requests whose queries ran on a read replica')
+with app.app_context():
+    init_pool_metrics(app, {engine_name(key): engine for key, engine in db.engines.items()})
+
+
+# =============================================================================
+# POOL DIAGNOSTICS
+# =============================================================================
+# GET /metrics/pool shows the pool settings and how the pool has coped so far.
+# Use it to size the pool against the number of worker threads:
+#   - every request holds at most one connection, so a process never needs
+#     more than pool_size + max_overflow >= its number of threads
+#   - if peak_checked_out reaches capacity and wait times or timeouts grow,
+#     requests are queueing for connections: raise DB_POOL_SIZE (or
+#     DB_MAX_OVERFLOW), or run fewer threads per process
+#   - all processes together must stay below the server's max_connections
+# With read replicas every engine has its own pool, so the stats here and the
+# db_pool_* metrics are kept per engine: "primary" and the replicas' bind keys
+# (see engine_name()).
+
+@app.route('/metrics/pool')
+def pool_status():
+    """Pool settings, current state and checkout wait times, per engine"""
+    return jsonify({engine_name(key): engine_pool_status(key, engine) for key, engine in db.engines.items()})
+
+
+def engine_pool_status(key, engine):
+    pool = engine.pool
+    options = app.config['SQLALCHEMY_ENGINE_OPTIONS'] if key is None else app.config['SQLALCHEMY_BINDS'][key]
+    settings = {name: value for name, value in options.items() if name.startswith(('pool_', 'max_'))}
+    d = pool_checkout_stats(engine_name(key))
+    attempts = d['checkouts'] + d['timeouts']
+    result = {
+        'backend': engine.dialect.name,
+        'pool': type(pool).__name__,
+        'settings': settings,
+        'status': pool.status(),
+        'checkouts': d['checkouts'],
+        'timeouts': d['timeouts'],
+        'wait_ms': {
+            'mean': round(d['wait_total'] / attempts * 1000, 3) if attempts else 0.0,
+            'max': round(d['wait_max'] * 1000, 3),
+        },
+    }
+    if isinstance(pool, QueuePool):
+        result.update({
+            'capacity': pool.size() + max(settings.get('max_overflow', 0), 0),
+            'checked_out': pool.checkedout(),
+            'peak_checked_out': d['peak_checked_out'],
+        })
+    return result
+
+
+# =============================================================================
+# READ REPLICAS
+# =============================================================================
+# With DATABASE_REPLICA_URLS set, the queries of views marked @read_only run
+# on a replica, taking that load off the primary. Each request picks the next
+# replica in turn (round robin). Everything else - writes, and any view that
+# writes - uses DATABASE_URL.
+#
+# Replicas lag a little behind the primary. So that users always see their
+# own changes, a browser that just wrote something keeps reading from the
+# primary for REPLICA_STICKY_SECONDS (read-your-writes).
+#
+# To try it locally, use SQLite files as replicas:
+#   DATABASE_REPLICA_URLS=sqlite:///replica1.db,sqlite:///replica2.db
+# init_db() copies the primary into them at startup, so products added
+# afterwards only show up on the replicas after a restart - after adding one,
+# the list shows it for REPLICA_STICKY_SECONDS and then loses it again.
+
+replica_cycle = itertools.cycle(REPLICA_BINDS)
+
+
+def read_only(view):
+    """Mark a view whose queries may run on a replica"""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        g.read_only = True
+        return view(*args, **kwargs)
+    return wrapper
+
+
+def use_replica():
+    if not REPLICA_BINDS or not has_request_context() or not g.get('read_only'):
+        return False
+    last_write = session.get('last_write')
+    return last_write is None or time.time() - last_write > app.config['REPLICA_STICKY_SECONDS']
+
+
+def replica_for_request():
+    """The same replica for every query of a request"""
+    if 'replica' not in g:
+        g.replica = db.engines[next(replica_cycle)]
+        url = g.replica.url.render_as_string(hide_password=True)
+        metrics_registry.inc('db_replica_requests_total', (('replica', url),))
+    return g.replica
+
+
+@event.listens_for(RoutingSession, 'after_flush')
+def remember_write(db_session, flush_context):
+    if has_request_context():
+        session['last_write'] = time.time()
+
+
+def copy_to_sqlite_replicas():
+    """Stand-in for replication when the primary and replicas are SQLite files"""
+    if db.engine.dialect.name != 'sqlite':
+        return
+    for key in REPLICA_BINDS:
+        engine = db.engines[key]
+        if engine.dialect.name == 'sqlite':
+            with db.engine.connect() as source, engine.connect() as target:
+                source.connection.driver_connection.backup(target.connection.driver_connection)
 
 
 # =============================================================================
@@ -66,6 +329,7 @@ class Product(db.Model):
 # =============================================================================
 
 @app.route('/')
+@read_only
 def index():
     products = Product.query.all()
     # Show which database is being used
@@ -126,6 +390,8 @@ def init_db():
             db.session.commit()
             print('Sample products added!')
 
+        copy_to_sqlite_replicas()
+
 
 if __name__ == '__main__':
     init_db()
@@ -193,6 +459,28 @@ if __name__ == '__main__':
 #
 #   Then load with python-dotenv (already done in this file)
 #
+# Connection pool (see pool_options(), the defaults depend on the database):
+#   DB_POOL_CLASS      queue, null or static
+#   DB_POOL_SIZE       connections kept open
+#   DB_MAX_OVERFLOW    extra connections allowed under load
+#   DB_POOL_TIMEOUT    seconds to wait for a free connection
+#   DB_POOL_RECYCLE    reconnect connections older than this (-1 = never)
+#   DB_POOL_USE_LIFO   reuse the most recently returned connection first
+#   DB_POOL_PRE_PING   ping every connection before handing it out
+#
+# Read replicas (see READ REPLICAS):
+#   DATABASE_REPLICA_URLS    comma separated replica URLs
+#   REPLICA_STICKY_SECONDS   read from the primary this long after a write
+#
+# Templates (see TEMPLATE CACHE):
+#   TEMPLATE_CACHE_DIR       keep compiled templates in this folder
+#   PRECOMPILE_TEMPLATES     compile every template at startup
+#
+# Compression (see RESPONSE COMPRESSION):
+#   COMPRESS_MIN_SIZE        smaller responses are sent uncompressed (bytes)
+#   COMPRESS_LEVEL           gzip level, 1 (fastest) to 9 (smallest)
+#   COMPRESS_BR_QUALITY      brotli quality, 0 (fastest) to 11 (smallest)
+#
 # =============================================================================
 
 
@@ -12,6 +12,14 @@ How to Run:
 
 from flask import Flask, render_template, request, redirect, url_for
 from flask_sqlalchemy import SQLAlchemy
+import os
+import sys
+
+# The helpers shared by all parts live in ../shared
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+from shared.sqlite import use_sqlite_pragmas
 
 app = Flask(__name__)
 app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///inventory.db'
@@ -19,6 +27,15 @@ app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 
 db = SQLAlchemy(app)
 
+# =============================================================================
+# SQLITE TUNING (Already done for you)
+# =============================================================================
+# Every new SQLite connection runs SQLITE_PRAGMAS (WAL mode etc.), see shared/sqlite.py.
+
+with app.app_context():
+    use_sqlite_pragmas(db.engine)
+
+
 
 # =============================================================================
 # STEP 1: Product Model (Already done for you)
@@ -0,0 +1,7 @@
+"""
+Helpers shared by the part-N apps.
+
+Each app.py puts the repository root on sys.path and imports what it needs
+from here, so settings like the SQLite pragmas are defined in one place
+instead of being copied into every app.
+"""
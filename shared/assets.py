@@ -0,0 +1,72 @@
+"""
+Fingerprinted static assets, used by parts 2 and 4.
+
+`python tools/build_assets.py` minifies static/css and static/js into
+static/dist, with a hash of the content in every file name
+(css/style.css -> dist/css/style.1a2b3c4d5e6f.css), and writes gzip (and
+brotli) copies plus static/dist/manifest.json next to them.
+
+When the manifest exists, url_for('static', filename='css/style.css')
+returns the hashed name. A hashed file never changes - a new version gets
+a new name - so browsers may keep it for a year without asking again, and
+repeat visits download no CSS at all. Each download picks the smallest
+copy the browser accepts (br, then gzip).
+Without a build the original files are served as before. Rebuild and
+restart the app after changing a CSS/JS file.
+
+    init_assets(app)
+"""
+
+import json
+import mimetypes
+import os
+
+from flask import current_app, request, send_from_directory
+
+ASSET_MANIFEST = os.path.join('dist', 'manifest.json')  # in the static folder, see tools/build_assets.py
+ASSET_MAX_AGE = 365 * 24 * 3600  # one year, in seconds
+ASSET_ENCODINGS = [('br', '.br'), ('gzip', '.gz')]  # preferred first
+
+
+def init_assets(app):
+    """Serve app's built assets, if any, in place of the original static files"""
+    manifest = load_asset_manifest(app.static_folder)
+    app.extensions['assets'] = {'manifest': manifest, 'fingerprinted': set(manifest.values())}
+    app.url_defaults(fingerprint_static_url)
+    app.view_functions['static'] = serve_static
+
+
+def load_asset_manifest(static_folder):
+    try:
+        with open(os.path.join(static_folder, ASSET_MANIFEST)) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def fingerprint_static_url(endpoint, values):
+    """Make url_for('static', ...) point at the hashed file, if one was built"""
+    manifest = current_app.extensions['assets']['manifest']
+    if endpoint == 'static' and values.get('filename') in manifest:
+        values['filename'] = manifest[values['filename']]
+
+
+def serve_static(filename):
+    """Flask's static view, plus far-future caching and precompressed copies"""
+    app = current_app
+    if filename not in app.extensions['assets']['fingerprinted']:
+        return app.send_static_file(filename)
+
+    mimetype = mimetypes.guess_type(filename)[0]
+    for encoding, suffix in ASSET_ENCODINGS:
+        if (request.accept_encodings[encoding] > 0
+                and os.path.exists(os.path.join(app.static_folder, filename + suffix))):
+            response = send_from_directory(app.static_folder, filename + suffix,
+                                           mimetype=mimetype, max_age=ASSET_MAX_AGE)
+            response.content_encoding = encoding
+            break
+    else:
+        response = send_from_directory(app.static_folder, filename, max_age=ASSET_MAX_AGE)
+    response.cache_control.immutable = True
+    response.vary.add('Accept-Encoding')
+    return response
@@ -0,0 +1,124 @@
+"""
+Response compression used by every app.
+
+Text responses (HTML pages, JSON) are compressed for browsers that accept
+it (Accept-Encoding): brotli when the brotli package is installed
+(`pip install brotli`), otherwise gzip. Bodies smaller than
+COMPRESS_MIN_SIZE bytes are sent as they are - a few bytes saved aren't
+worth the CPU time.
+
+Streamed responses are compressed piece by piece, and every piece is
+flushed right away, so the browser still gets the page while it renders.
+Files (static assets) are left alone. benchmarks/compression.py compares
+the CPU time spent with the bytes saved.
+"""
+
+import zlib
+
+from flask import current_app, request
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE_TYPES = {
+    'text/html', 'text/plain', 'text/css', 'text/csv', 'text/javascript',
+    'application/json', 'application/x-ndjson', 'application/javascript', 'image/svg+xml',
+}
+
+
+def init_compression(app):
+    """Compress app's responses, with the defaults below unless app.config sets them"""
+    app.config.setdefault('COMPRESS_MIN_SIZE', 500)   # bytes
+    app.config.setdefault('COMPRESS_LEVEL', 6)        # gzip: 1 (fastest) to 9 (smallest)
+    app.config.setdefault('COMPRESS_BR_QUALITY', 4)   # brotli: 0 (fastest) to 11 (smallest)
+    app.after_request(compress_response)
+
+
+class Compressor:
+    """gzip or brotli compression, all at once or piece by piece"""
+
+    def __init__(self, encoding, level=6, br_quality=4):
+        self.encoding = encoding
+        if encoding == 'br':
+            self.compressor = brotli.Compressor(quality=br_quality)
+        else:
+            # wbits=31: deflate with a gzip header and trailer
+            self.compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    @classmethod
+    def for_app(cls, encoding, app=None):
+        """A Compressor with the levels from app.config (default: the current app)"""
+        config = (app or current_app).config
+        return cls(encoding, config['COMPRESS_LEVEL'], config['COMPRESS_BR_QUALITY'])
+
+    def compress(self, data):
+        """Compress a whole body"""
+        return self.chunk(data, flush=False) + self.finish()
+
+    def chunk(self, data, flush=True):
+        """Compress one piece; flush=True makes it decodable right away"""
+        if self.encoding == 'br':
+            out = self.compressor.process(data)
+            return out + self.compressor.flush() if flush else out
+        out = self.compressor.compress(data)
+        return out + self.compressor.flush(zlib.Z_SYNC_FLUSH) if flush else out
+
+    def finish(self):
+        if self.encoding == 'br':
+            return self.compressor.finish()
+        return self.compressor.flush()
+
+
+def accepted_encoding():
+    """The best encoding the client accepts, or None"""
+    if brotli is not None and request.accept_encodings['br'] > 0:
+        return 'br'
+    if request.accept_encodings['gzip'] > 0:
+        return 'gzip'
+    return None
+
+
+def compress_stream(body, compressor):
+    """Compress a streamed response body piece by piece"""
+    try:
+        for data in body:
+            if isinstance(data, str):
+                data = data.encode()
+            if data:  # an empty flush would still cost a few bytes
+                yield compressor.chunk(data)
+        yield compressor.finish()
+    finally:
+        if hasattr(body, 'close'):
+            body.close()  # closes the original generator (and its query)
+
+
+def compress_response(response):
+    if (response.direct_passthrough  # files are sent as they are
+            or response.content_encoding
+            or response.mimetype not in COMPRESSIBLE_TYPES
+            or response.status_code < 200 or response.status_code in (204, 206, 304)
+            or response.cache_control.no_transform):
+        return response
+    if not response.is_streamed and len(response.get_data()) < current_app.config['COMPRESS_MIN_SIZE']:
+        return response
+
+    response.vary.add('Accept-Encoding')  # caches must keep one copy per encoding
+    encoding = accepted_encoding()
+    if encoding is None:
+        return response
+
+    compressor = Compressor.for_app(encoding)
+    if response.is_streamed:
+        response.response = compress_stream(response.response, compressor)
+        response.headers.pop('Content-Length', None)
+    else:
+        response.set_data(compressor.compress(response.get_data()))
+    response.content_encoding = encoding
+    # Compressed bytes differ from the original ones, so a strong ETag
+    # becomes weak (conditional GETs compare If-None-Match weakly)
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+    return response
@@ -0,0 +1,206 @@
+"""
+Per-request SQL instrumentation used by every app.
+
+Every statement is timed. For each request the app keeps the number of
+queries, the time spent in the database and the slowest statement (in
+g.sql), and
+  - sends them back in a Server-Timing header (the browser's developer
+    tools show it under Network -> Timing)
+  - adds them up per endpoint, see sql_metrics_summary() and GET /metrics
+Statements slower than the app's SLOW_QUERY_MS are logged with their
+query plan.
+
+    init_sql_instrumentation(app)
+    sqlite3.connect(..., factory=InstrumentedConnection)   # raw sqlite3
+    instrument_engine(engine)                               # SQLAlchemy
+"""
+
+import sqlite3
+import threading
+import time
+
+from flask import current_app, g, has_request_context, jsonify, request
+
+
+def init_sql_instrumentation(app, metrics_route=True):
+    """
+    Add the Server-Timing header to every response of app. metrics_route=False
+    leaves GET /metrics to the app (see sql_metrics_summary()).
+    """
+    app.config.setdefault('SLOW_QUERY_MS', 100)
+    app.extensions['sql_metrics'] = {'endpoints': {}, 'lock': threading.Lock()}
+    app.after_request(add_server_timing)
+    if metrics_route:
+        app.add_url_rule('/metrics', view_func=metrics)
+
+
+def new_sql_stats():
+    return {'count': 0, 'time_ms': 0.0, 'slowest_ms': 0.0, 'slowest': None}
+
+
+def add_server_timing(response):
+    """Report this request's SQL stats in Server-Timing and add them to /metrics"""
+    stats = g.get('sql') or new_sql_stats()
+    timing = f'db;dur={stats["time_ms"]:.2f};desc="{stats["count"]} queries"'
+    if stats['slowest']:
+        timing += f', db-slowest;dur={stats["slowest_ms"]:.2f}'
+    response.headers['Server-Timing'] = timing
+
+    sql_metrics = current_app.extensions['sql_metrics']
+    with sql_metrics['lock']:
+        totals = sql_metrics['endpoints'].setdefault(request.endpoint or 'unknown', {
+            'requests': 0, 'queries': 0, 'time_ms': 0.0, 'slowest_ms': 0.0, 'slowest': None})
+        totals['requests'] += 1
+        totals['queries'] += stats['count']
+        totals['time_ms'] += stats['time_ms']
+        if stats['slowest_ms'] > totals['slowest_ms']:
+            totals['slowest_ms'], totals['slowest'] = stats['slowest_ms'], ' '.join(stats['slowest'].split())
+    return response
+
+
+def sql_metrics_summary():
+    """The current app's SQL totals per endpoint since it started"""
+    sql_metrics = current_app.extensions['sql_metrics']
+    with sql_metrics['lock']:
+        endpoints = {
+            name: {
+                'requests': t['requests'],
+                'queries': t['queries'],
+                'queries_per_request': round(t['queries'] / t['requests'], 2),
+                'db_time_ms': round(t['time_ms'], 2),
+                'db_time_per_request_ms': round(t['time_ms'] / t['requests'], 3),
+                'slowest_ms': round(t['slowest_ms'], 3),
+                'slowest': t['slowest'],
+            }
+            for name, t in sql_metrics['endpoints'].items()
+        }
+    return {'slow_query_ms': current_app.config['SLOW_QUERY_MS'], 'endpoints': endpoints}
+
+
+def metrics():
+    """SQL totals per endpoint since the app started"""
+    return jsonify(sql_metrics_summary())
+
+
+# -----------------------------------------------------------------------------
+# Raw sqlite3 (parts 1 and 2)
+# -----------------------------------------------------------------------------
+
+class InstrumentedCursor(sqlite3.Cursor):
+    """A cursor that reports how long its statements take (running and fetching)"""
+
+    def execute(self, sql, parameters=()):
+        self.sql, self.parameters, self.elapsed_ms, self.logged = sql, parameters, 0.0, False
+        return self._timed(super().execute, sql, parameters, new=True)
+
+    def executemany(self, sql, seq_of_parameters):
+        self.sql, self.parameters, self.elapsed_ms, self.logged = sql, None, 0.0, False
+        return self._timed(super().executemany, sql, seq_of_parameters, new=True)
+
+    def fetchone(self):
+        return self._timed(super().fetchone)
+
+    def fetchmany(self, *args):
+        return self._timed(super().fetchmany, *args)
+
+    def fetchall(self):
+        return self._timed(super().fetchall)
+
+    def __next__(self):
+        return self._timed(super().__next__)
+
+    def _timed(self, method, *args, new=False):
+        start = time.perf_counter()
+        try:
+            return method(*args)
+        finally:
+            record_query(self, (time.perf_counter() - start) * 1000, new)
+
+
+class InstrumentedConnection(sqlite3.Connection):
+    """A connection whose cursors (including conn.execute's) are InstrumentedCursors"""
+
+    def cursor(self, factory=InstrumentedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+
+def record_query(cursor, elapsed_ms, new):
+    cursor.elapsed_ms += elapsed_ms
+    if not has_request_context():
+        return
+    stats = g.setdefault('sql', new_sql_stats())
+    stats['count'] += new
+    stats['time_ms'] += elapsed_ms
+    if cursor.elapsed_ms > stats['slowest_ms']:
+        stats['slowest_ms'], stats['slowest'] = cursor.elapsed_ms, cursor.sql
+    if cursor.elapsed_ms >= current_app.config['SLOW_QUERY_MS'] and not cursor.logged:
+        cursor.logged = True
+        log_slow_query(cursor)
+
+
+def log_slow_query(cursor):
+    """Log a slow statement together with SQLite's plan for it"""
+    plan = ''
+    if cursor.parameters is not None:
+        try:
+            rows = sqlite3.Cursor(cursor.connection).execute(
+                'EXPLAIN QUERY PLAN ' + cursor.sql, cursor.parameters).fetchall()
+            plan = ''.join(f'\n    {row[-1]}' for row in rows)
+        except sqlite3.Error as e:
+            plan = f'\n    (no plan: {e})'
+    current_app.logger.warning('Slow query (%.1f ms): %s%s',
+                               cursor.elapsed_ms, ' '.join(cursor.sql.split()), plan)
+
+
+# -----------------------------------------------------------------------------
+# SQLAlchemy (parts 3 to 5)
+# -----------------------------------------------------------------------------
+
+def instrument_engine(engine):
+    """Time every statement run on a SQLAlchemy engine"""
+    from sqlalchemy import event  # imported here: parts 1 and 2 don't use SQLAlchemy
+
+    # The start time is kept on the statement's execution context, which is
+    # thrown away with it - also when the statement fails and
+    # after_cursor_execute never runs
+    @event.listens_for(engine, 'before_cursor_execute')
+    def start_query_timer(conn, cursor, statement, parameters, context, executemany):
+        context.query_start = time.perf_counter()
+
+    @event.listens_for(engine, 'after_cursor_execute')
+    def stop_query_timer(conn, cursor, statement, parameters, context, executemany):
+        elapsed_ms = (time.perf_counter() - context.query_start) * 1000
+        if not has_request_context():
+            return
+        stats = g.setdefault('sql', new_sql_stats())
+        stats['count'] += 1
+        stats['time_ms'] += elapsed_ms
+        if elapsed_ms > stats['slowest_ms']:
+            stats['slowest_ms'], stats['slowest'] = elapsed_ms, statement
+        if elapsed_ms >= current_app.config['SLOW_QUERY_MS']:
+            log_slow_statement(conn, statement, None if executemany else parameters, elapsed_ms)
+
+
+def log_slow_statement(conn, statement, parameters, elapsed_ms):
+    """Log a slow statement together with the database's plan for it"""
+    plan = ''
+    # Only plain SELECTs are explained: EXPLAIN runs inside the request's
+    # transaction, and a failing one would abort it on PostgreSQL
+    if parameters is not None and statement.lstrip().upper().startswith(('SELECT', 'WITH')):
+        sqlite = conn.dialect.name == 'sqlite'
+        try:
+            cursor = conn.connection.cursor()  # plain DB-API cursor, not timed again
+            cursor.execute(('EXPLAIN QUERY PLAN ' if sqlite else 'EXPLAIN ') + statement, parameters)
+            rows = cursor.fetchall()
+            cursor.close()
+            plan = ''.join('\n    ' + (str(row[-1]) if sqlite else ' | '.join(map(str, row)))
+                           for row in rows)
+        except Exception as e:
+            plan = f'\n    (no plan: {e})'
+    current_app.logger.warning('Slow query (%.1f ms): %s%s', elapsed_ms, ' '.join(statement.split()), plan)
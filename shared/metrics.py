@@ -0,0 +1,252 @@
+"""
+Prometheus metrics used by the API apps (parts 4 and 5).
+
+GET /metrics returns these in the Prometheus text format, ready to scrape:
+
+  http_requests_total              requests by endpoint, method and status
+  http_request_errors_total        requests that ended in a 5xx
+  http_request_duration_seconds    latency histogram per endpoint
+  db_queries_total, db_query_seconds_total   SQL work per endpoint (from
+                                   shared/instrumentation.py)
+  db_pool_*                        connection pool gauges and wait times,
+                                   per engine (see init_pool_metrics())
+  metrics_overhead_seconds         what recording all this costs a request
+
+GET /metrics?format=json returns the SQL totals per endpoint instead.
+Recording a request is a couple of dict updates under one lock, and its
+cost is measured into metrics_overhead_seconds.
+
+    metrics_registry = init_metrics(app)
+    init_pool_metrics(app, {'primary': engine})
+"""
+
+import bisect
+import threading
+import time
+
+from flask import Response, current_app, g, jsonify, request
+from sqlalchemy import exc
+from sqlalchemy.pool import QueuePool
+
+from shared.instrumentation import sql_metrics_summary
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+POOL_WAIT_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)
+OVERHEAD_BUCKETS = (0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001)
+
+
+def format_labels(labels):
+    """(('endpoint', 'index'),) -> {endpoint="index"}"""
+    if not labels:
+        return ''
+    escape = lambda v: str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+    return '{' + ','.join(f'{k}="{escape(v)}"' for k, v in labels) + '}'
+
+
+class MetricsRegistry:
+    """Counters, histograms and gauges, exported in the Prometheus text format"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._meta = {}        # name -> (type, help), in export order
+        self._counters = {}    # name -> {labels: value}
+        self._histograms = {}  # name -> (buckets, {labels: [count per bucket..., +Inf, sum]})
+        self._gauges = {}      # name -> function returning {labels: value}
+
+    def counter(self, name, help):
+        self._meta[name] = ('counter', help)
+        self._counters[name] = {}
+
+    def histogram(self, name, help, buckets):
+        self._meta[name] = ('histogram', help)
+        self._histograms[name] = (buckets, {})
+
+    def gauge(self, name, help, read):
+        self._meta[name] = ('gauge', help)
+        self._gauges[name] = read
+
+    def inc(self, name, labels=(), amount=1):
+        with self._lock:
+            values = self._counters[name]
+            values[labels] = values.get(labels, 0) + amount
+
+    def observe(self, name, labels, value):
+        buckets, series = self._histograms[name]
+        index = bisect.bisect_left(buckets, value)  # first bucket with value <= le
+        with self._lock:
+            counts = series.get(labels)
+            if counts is None:
+                counts = series[labels] = [0] * (len(buckets) + 2)
+            counts[index] += 1
+            counts[-1] += value
+
+    def render(self):
+        with self._lock:
+            counters = {name: dict(values) for name, values in self._counters.items()}
+            histograms = {name: (buckets, {labels: list(counts) for labels, counts in series.items()})
+                          for name, (buckets, series) in self._histograms.items()}
+
+        lines = []
+        for name, (kind, help) in self._meta.items():
+            lines.append(f'# HELP {name} {help}')
+            lines.append(f'# TYPE {name} {kind}')
+            if kind == 'counter':
+                for labels, value in counters[name].items():
+                    lines.append(f'{name}{format_labels(labels)} {value}')
+            elif kind == 'gauge':
+                for labels, value in self._gauges[name]().items():
+                    lines.append(f'{name}{format_labels(labels)} {value}')
+            else:
+                buckets, series = histograms[name]
+                for labels, counts in series.items():
+                    total = 0
+                    for bound, count in zip(buckets + (None,), counts):
+                        total += count
+                        le = '+Inf' if bound is None else repr(bound)
+                        lines.append(f'{name}_bucket{format_labels(labels + (("le", le),))} {total}')
+                    lines.append(f'{name}_sum{format_labels(labels)} {counts[-1]}')
+                    lines.append(f'{name}_count{format_labels(labels)} {total}')
+        return '\n'.join(lines) + '\n'
+
+
+def init_metrics(app):
+    """
+    Record every request of app and serve GET /metrics. Returns the
+    MetricsRegistry, for the app to add its own metrics to. Call
+    init_sql_instrumentation(app, metrics_route=False) first.
+    """
+    registry = MetricsRegistry()
+    registry.counter('http_requests_total', 'Requests handled')
+    registry.counter('http_request_errors_total', 'Requests answered with a 5xx status')
+    registry.histogram('http_request_duration_seconds', 'Time to build the response', LATENCY_BUCKETS)
+    registry.counter('db_queries_total', 'SQL statements run')
+    registry.counter('db_query_seconds_total', 'Time spent running SQL statements')
+    registry.histogram('metrics_overhead_seconds', 'Time spent recording a request in these metrics',
+                       OVERHEAD_BUCKETS)
+    app.extensions['metrics'] = registry
+    app.before_request(start_request_timer)
+    app.after_request(record_request_metrics)
+    app.add_url_rule('/metrics', view_func=metrics)
+    return registry
+
+
+def start_request_timer():
+    g.request_start = time.perf_counter()
+
+
+def record_request_metrics(response):
+    start = g.get('request_start')
+    if start is None:
+        return response
+    now = time.perf_counter()
+    registry = current_app.extensions['metrics']
+    endpoint = (('endpoint', request.endpoint or 'unknown'),)
+    registry.inc('http_requests_total',
+                 endpoint + (('method', request.method), ('status', response.status_code)))
+    if response.status_code >= 500:
+        registry.inc('http_request_errors_total', endpoint)
+    registry.observe('http_request_duration_seconds', endpoint, now - start)
+    stats = g.get('sql')
+    if stats:
+        registry.inc('db_queries_total', endpoint, stats['count'])
+        registry.inc('db_query_seconds_total', endpoint, stats['time_ms'] / 1000)
+    registry.observe('metrics_overhead_seconds', (), time.perf_counter() - now)
+    return response
+
+
+def metrics():
+    """Prometheus metrics, or the SQL totals per endpoint with ?format=json"""
+    if request.args.get('format') != 'json':
+        return Response(current_app.extensions['metrics'].render(),
+                        content_type='text/plain; version=0.0.4; charset=utf-8')
+    return jsonify(sql_metrics_summary())
+
+
+# Connection pools
+#
+# Every connection an engine hands out is timed (db_pool_wait_seconds): the
+# time engine.connect() takes, which is the wait for a free connection, or
+# the time to open a new one. Checkouts that give up after pool_timeout
+# seconds are counted in db_pool_timeouts_total. Only public SQLAlchemy
+# API is used - engine.connect() and the pool's status methods - rather
+# than overriding the pool's private _do_get().
+
+def init_pool_metrics(app, engines):
+    """
+    db_pool_* metrics for `engines` ({name: engine}), labelled
+    engine="<name>". Call init_metrics(app) first.
+    """
+    registry = app.extensions['metrics']
+    app.extensions['pool_checkouts'] = {'engines': {}, 'lock': threading.Lock()}
+
+    def gauge(stat):
+        return lambda: pool_gauge(engines, stat)
+
+    registry.gauge('db_pool_size', 'Connections the pool keeps open', gauge('size'))
+    registry.gauge('db_pool_checked_out', 'Connections in use', gauge('checkedout'))
+    registry.gauge('db_pool_checked_in', 'Open connections waiting in the pool', gauge('checkedin'))
+    registry.gauge('db_pool_overflow', 'Connections open beyond the pool size', gauge('overflow'))
+    registry.histogram('db_pool_wait_seconds',
+                       'Time to get a connection from the pool (waiting or opening one)',
+                       POOL_WAIT_BUCKETS)
+    registry.counter('db_pool_timeouts_total', 'Checkouts that gave up after pool_timeout seconds')
+    for name, engine in engines.items():
+        time_checkouts(app, name, engine)
+
+
+def pool_gauge(engines, stat):
+    """Read one of the pools' counters at scrape time, labelled by engine"""
+    values = {}
+    for name, engine in engines.items():
+        pool = engine.pool
+        if isinstance(pool, QueuePool):  # other pools don't keep these counts
+            value = getattr(pool, stat)()
+            values[(('engine', name),)] = max(value, 0) if stat == 'overflow' else value
+    return values
+
+
+def new_checkout_stats():
+    return {'checkouts': 0, 'timeouts': 0, 'wait_total': 0.0, 'wait_max': 0.0, 'peak_checked_out': 0}
+
+
+def time_checkouts(app, name, engine):
+    """Time every engine.connect() (sessions, engine.begin() etc. all go through it)"""
+    registry = app.extensions['metrics']
+    checkouts = app.extensions['pool_checkouts']
+    stats = checkouts['engines'][name] = new_checkout_stats()
+    labels = (('engine', name),)
+    connect = engine.connect
+
+    def record(waited, timed_out):
+        registry.observe('db_pool_wait_seconds', labels, waited)
+        if timed_out:
+            registry.inc('db_pool_timeouts_total', labels)
+        pool = engine.pool
+        checked_out = pool.checkedout() if isinstance(pool, QueuePool) else 0
+        with checkouts['lock']:
+            stats['timeouts' if timed_out else 'checkouts'] += 1
+            stats['wait_total'] += waited
+            stats['wait_max'] = max(stats['wait_max'], waited)
+            stats['peak_checked_out'] = max(stats['peak_checked_out'], checked_out)
+
+    def timed_connect():
+        start = time.perf_counter()
+        try:
+            connection = connect()
+        except exc.TimeoutError:  # all connections busy for pool_timeout seconds
+            record(time.perf_counter() - start, timed_out=True)
+            raise
+        record(time.perf_counter() - start, timed_out=False)
+        return connection
+
+    engine.connect = timed_connect
+
+
+def pool_checkout_stats(name):
+    """
+    Checkout counts and wait times of the current app's engine `name`:
+    checkouts, timeouts, wait_total and wait_max (seconds), peak_checked_out
+    """
+    checkouts = current_app.extensions['pool_checkouts']
+    with checkouts['lock']:
+        return dict(checkouts['engines'].get(name) or new_checkout_stats())
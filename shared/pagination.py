@@ -0,0 +1,140 @@
+"""
+Keyset pagination for the student lists of parts 1-3.
+
+The lists show one page at a time instead of every row. Pages use keyset
+("seek") pagination: the Next link carries the sort value and id of the
+last row shown, and the next query asks for the rows after it:
+
+  SELECT * FROM students WHERE (name, id) > (?, ?) ORDER BY name, id LIMIT 51
+
+With an index on the sort column (SQLite keeps the id in every index entry)
+the database starts reading right at that row, so page 1000 is as quick as
+page 1. OFFSET would read and throw away every earlier row first.
+
+The query string says which page to show: ?sort=name&order=asc&per_page=50,
+then after=<position> or before=<position> from the Next / Previous links.
+Only the columns in the app's PAGE_SORT_COLUMNS are put into the SQL.
+
+    app.config['PAGE_SORT_COLUMNS'] = ('id', 'name', 'email')
+    init_pagination(app)
+    rows, prev_position, next_position = sql_page(conn, 'students')   # sqlite3
+    students, prev_position, next_position = query_page(query, Student)  # SQLAlchemy
+"""
+
+from flask import current_app, request, url_for
+
+
+def init_pagination(app):
+    """Add the page_url() and sort_url() template helpers to app"""
+    app.config.setdefault('PAGE_SORT_COLUMNS', ('id',))
+    app.config.setdefault('PAGE_DEFAULT_SORT', 'id')
+    app.config.setdefault('PER_PAGE', 50)
+    app.config.setdefault('MAX_PER_PAGE', 200)
+    app.add_template_global(page_url)
+    app.add_template_global(sort_url)
+
+
+def list_args():
+    """sort, order and per_page from the query string, with safe defaults"""
+    config = current_app.config
+    sort = request.args.get('sort', config['PAGE_DEFAULT_SORT'])
+    if sort not in config['PAGE_SORT_COLUMNS']:
+        sort = config['PAGE_DEFAULT_SORT']
+    order = request.args.get('order', 'desc' if sort == 'id' else 'asc')
+    if order not in ('asc', 'desc'):
+        order = 'asc'
+    per_page = request.args.get('per_page', config['PER_PAGE'], type=int)
+    return sort, order, min(max(per_page, 1), config['MAX_PER_PAGE'])
+
+
+def parse_position(raw, sort):
+    """'12:Alice' -> ('Alice', 12): the sort key of the row a page starts from"""
+    row_id, _, value = (raw or '').partition(':')
+    if not row_id.isdigit():
+        return None
+    return (int(row_id),) if sort == 'id' else (value, int(row_id))
+
+
+def position(row, sort):
+    """The reverse of parse_position() for a sqlite3.Row or a model object"""
+    get = row.__getitem__ if hasattr(row, 'keys') else lambda key: getattr(row, key)
+    return str(get('id')) if sort == 'id' else f'{get("id")}:{get(sort)}'
+
+
+def keyset_page(seek):
+    """
+    One page of rows for the sort, order, per_page and after/before position
+    in the query string. seek(keys, start, descending, limit) runs the query:
+    the first `limit` rows ordered by the `keys` column names, only those
+    after (or, descending, before) the `start` values if given.
+    Returns (rows, prev_position, next_position); a position is None when
+    there is no page in that direction.
+    """
+    sort, order, per_page = list_args()
+    after = parse_position(request.args.get('after'), sort)
+    before = None if after else parse_position(request.args.get('before'), sort)
+
+    # The previous page is read backwards from `before`, then flipped around
+    backwards = before is not None
+    descending = (order == 'desc') != backwards
+    keys = ['id'] if sort == 'id' else [sort, 'id']
+    start = after or before
+    rows = list(seek(keys, start, descending, per_page + 1))
+
+    # One extra row was fetched to find out whether there is more that way
+    more = len(rows) > per_page
+    rows = rows[:per_page]
+    if backwards:
+        rows.reverse()
+    has_prev = more if backwards else start is not None
+    has_next = True if backwards else more
+    return (rows,
+            position(rows[0], sort) if rows and has_prev else None,
+            position(rows[-1], sort) if rows and has_next else None)
+
+
+def sql_page(conn, table, where='', params=()):
+    """keyset_page() of the rows of `table` matching `where`, on a sqlite3 connection"""
+    def seek(keys, start, descending, limit):
+        conditions, values = ([where] if where else []), list(params)
+        if start:
+            placeholders = ', '.join('?' * len(keys))
+            conditions.append(f"({', '.join(keys)}) {'<' if descending else '>'} ({placeholders})")
+            values += start
+        sql = f'SELECT * FROM {table}'
+        if conditions:
+            sql += ' WHERE ' + ' AND '.join(conditions)
+        sql += ' ORDER BY ' + ', '.join(f'{key} {"DESC" if descending else "ASC"}' for key in keys)
+        return conn.execute(sql + ' LIMIT ?', values + [limit]).fetchall()
+
+    return keyset_page(seek)
+
+
+def query_page(query, model):
+    """keyset_page() of the `model` objects of a SQLAlchemy query"""
+    from sqlalchemy import tuple_  # imported here: parts 1 and 2 don't use SQLAlchemy
+
+    def seek(keys, start, descending, limit):
+        columns = [getattr(model, key) for key in keys]
+        filtered = query
+        if start:
+            row_key = tuple_(*columns)
+            filtered = filtered.filter(row_key < start if descending else row_key > start)
+        order_by = (column.desc() if descending else column.asc() for column in columns)
+        return filtered.order_by(*order_by).limit(limit).all()
+
+    return keyset_page(seek)
+
+
+def page_url(**changes):
+    """This page's URL with some query arguments changed (None removes one)"""
+    args = request.args.to_dict()
+    args.update(changes)
+    return url_for(request.endpoint, **{key: value for key, value in args.items() if value is not None})
+
+
+def sort_url(column):
+    """Column header link: sort by the column, or flip the order if already sorted by it"""
+    sort, order, _ = list_args()
+    new_order = 'desc' if (sort, order) == (column, 'asc') else 'asc'
+    return page_url(sort=column, order=new_order, after=None, before=None)
@@ -0,0 +1,35 @@
+"""
+SQLite connection settings used by every app.
+
+WAL mode lets readers keep reading while a write is in progress, and
+busy_timeout makes a writer wait for the lock instead of failing with
+"database is locked".
+"""
+
+SQLITE_PRAGMAS = [
+    'PRAGMA journal_mode = WAL',
+    'PRAGMA busy_timeout = 5000',     # milliseconds
+    'PRAGMA synchronous = NORMAL',    # safe with WAL, far fewer fsyncs
+    'PRAGMA mmap_size = 268435456',   # 256 MB memory-mapped reads
+    'PRAGMA cache_size = -20000',     # ~20 MB page cache (negative = KiB)
+]
+
+
+def apply_pragmas(conn):
+    """Run SQLITE_PRAGMAS on a newly opened DB-API connection"""
+    cursor = conn.cursor()
+    for pragma in SQLITE_PRAGMAS:
+        cursor.execute(pragma)
+    cursor.close()
+
+
+def use_sqlite_pragmas(engine):
+    """Apply SQLITE_PRAGMAS to every connection a SQLAlchemy engine opens"""
+    from sqlalchemy import event  # imported here: parts 1 and 2 don't use SQLAlchemy
+
+    if engine.dialect.name != 'sqlite':
+        return
+
+    @event.listens_for(engine, 'connect')
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        apply_pragmas(dbapi_connection)
@@ -0,0 +1,91 @@
+"""
+Template helpers used by every app: the compiled-template cache, and
+stream_page() for pages too long to build in memory (parts 1 and 3).
+
+Jinja turns every template into Python code the first time it is
+rendered, so the first request of each new worker pays for parsing and
+compiling it. Two settings move that work out of the request:
+
+  TEMPLATE_CACHE_DIR     keep the compiled templates on disk (relative to
+                         the app's folder); later starts load them instead
+                         of compiling. A template whose source changed is
+                         simply compiled again.
+  PRECOMPILE_TEMPLATES   compile every template at startup, before the
+                         first request comes in
+
+The cache can also be filled at build time (e.g. in a Dockerfile):
+  TEMPLATE_CACHE_DIR=.template_cache flask --app app precompile-templates
+benchmarks/cold_start.py measures startup and first-request time with and
+without them.
+"""
+
+import os
+
+from flask import Response, current_app, stream_with_context
+from jinja2 import FileSystemBytecodeCache
+
+STREAM_BUFFER = 100  # template output pieces per chunk (a table row is ~10)
+
+
+def init_template_cache(app):
+    """
+    Apply the app's TEMPLATE_CACHE_DIR and PRECOMPILE_TEMPLATES settings and
+    add the precompile-templates command. Call it before anything uses
+    app.jinja_env: the bytecode cache can't be added afterwards.
+    """
+    cache_dir = app.config.setdefault('TEMPLATE_CACHE_DIR', None)
+    if cache_dir:
+        path = os.path.join(app.root_path, cache_dir)
+        os.makedirs(path, exist_ok=True)
+        app.jinja_options = {**app.jinja_options, 'bytecode_cache': FileSystemBytecodeCache(path)}
+
+    @app.cli.command('precompile-templates')
+    def precompile_templates_command():
+        """Compile all templates into TEMPLATE_CACHE_DIR"""
+        if not app.config['TEMPLATE_CACHE_DIR']:
+            raise SystemExit('Set TEMPLATE_CACHE_DIR to the folder the compiled templates should go to')
+        names = precompile_templates(app)
+        print(f"Compiled {len(names)} templates into {app.config['TEMPLATE_CACHE_DIR']}")
+
+    if app.config.setdefault('PRECOMPILE_TEMPLATES', False):
+        precompile_templates(app)
+
+
+def precompile_templates(app):
+    """Compile every template now (and write it to the cache, if enabled)"""
+    names = app.jinja_env.list_templates()
+    for name in names:
+        app.jinja_env.get_template(name)
+    return names
+
+
+# Streamed pages
+#
+# render_template() builds the whole page in memory before sending any of
+# it. For pages with every row on them stream_page() sends the page while
+# it is being rendered instead: the template pulls rows from a lazy
+# iterator, and every STREAM_BUFFER pieces of output go to the browser as
+# soon as they are ready. The browser gets the first bytes immediately,
+# and the worker only holds the rows being rendered.
+#
+# Flask finishes the request as soon as the view returns (teardown hands
+# back the database connection), and only sets it up again while the page
+# is being sent. So the rows must be queried from inside the stream: the
+# row iterators are generators, which only run once the template starts
+# reading them. They get a database connection of their own, handed back
+# when the stream ends.
+#
+# Also keep in mind:
+#   - the status and headers are sent before the rows are read, so an
+#     error halfway through can only cut the page short
+#   - the Server-Timing header (and /metrics) only count the queries that
+#     ran before streaming started
+
+def stream_page(template_name, **context):
+    """Like render_template(), but renders while the response is sent"""
+    app = current_app
+    app.update_template_context(context)  # request, session, g, ...
+    stream = app.jinja_env.get_template(template_name).stream(context)
+    stream.enable_buffering(STREAM_BUFFER)
+    # stream_with_context makes request, g and url_for() work while streaming
+    return Response(stream_with_context(stream), content_type='text/html; charset=utf-8')
@@ -0,0 +1,71 @@
+"""
+Fixtures for the app tests.
+
+Every test gets its own copy of the part's folder in a temporary directory,
+without the .db files, so it starts from an empty database and never
+touches the real ones. The app is imported under a unique module name, so
+several parts (and several copies of one part) can be loaded in one
+process.
+
+How to Run:
+    python -m pytest -q                  # from the repository root
+    python -m pytest -q tests/test_part4.py
+"""
+
+import importlib.util
+import itertools
+import os
+import shutil
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# The apps import shared/ from the repository root
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+# Settings the apps read from the environment, cleared so a developer's
+# shell or .env can't change what the tests see
+APP_ENV = (
+    'DATABASE_URL', 'DATABASE_REPLICA_URLS', 'REPLICA_STICKY_SECONDS', 'ASYNC_DATABASE_URL',
+    'DB_POOL_CLASS', 'DB_POOL_SIZE', 'DB_MAX_OVERFLOW', 'DB_POOL_TIMEOUT', 'DB_POOL_RECYCLE',
+    'DB_POOL_USE_LIFO', 'DB_POOL_PRE_PING', 'TEMPLATE_CACHE_DIR', 'PRECOMPILE_TEMPLATES',
+    'SLOW_QUERY_MS', 'COMPRESS_MIN_SIZE', 'COMPRESS_LEVEL', 'COMPRESS_BR_QUALITY',
+)
+
+_module_ids = itertools.count()
+
+
+@pytest.fixture
+def load_app(tmp_path, monkeypatch):
+    """
+    load_app('part-2') imports part-2/app.py from a fresh copy of the folder
+    (and makes it the working directory, like `python app.py` would).
+    load_app('part-4', 'async_app.py') imports another file of the part; it
+    sees the part's app.py as `app`, with the same database.
+    """
+    for name in APP_ENV:
+        monkeypatch.delenv(name, raising=False)
+    monkeypatch.setattr(sys, 'path', list(sys.path))  # the apps add their root
+
+    def load(part, filename='app.py', **env):
+        for name, value in env.items():
+            monkeypatch.setenv(name, value)
+        workdir = tmp_path / part
+        if not workdir.exists():
+            shutil.copytree(os.path.join(ROOT, part), workdir,
+                            ignore=shutil.ignore_patterns('*.db', '*.db-*', '__pycache__'))
+        monkeypatch.chdir(workdir)
+        if filename != 'app.py':
+            monkeypatch.setitem(sys.modules, 'app', load(part))
+
+        name = f'test_{part.replace("-", "_")}_{filename[:-3]}_{next(_module_ids)}'
+        spec = importlib.util.spec_from_file_location(name, workdir / filename)
+        module = importlib.util.module_from_spec(spec)
+        monkeypatch.setitem(sys.modules, name, module)  # removed again after the test
+        spec.loader.exec_module(module)
+        return module
+
+    return load
@@ -0,0 +1,83 @@
+import pytest
+
+
+@pytest.fixture
+def m(load_app):
+    m = load_app('part-1')
+    m.init_db()
+    return m
+
+
+@pytest.fixture
+def client(m):
+    return m.app.test_client()
+
+
+def add_students(m, count):
+    with m.app.app_context():
+        conn = m.get_db_connection()
+        conn.executemany('INSERT INTO students (name, email, course) VALUES (?, ?, ?)',
+                         ((f'Student {i:03}', f's{i}@example.com', 'Python') for i in range(count)))
+        conn.commit()
+
+
+def test_empty_list(client):
+    response = client.get('/')
+    assert response.status_code == 200
+    assert b'Student' in response.data
+
+
+def test_add_student(client):
+    response = client.post('/add', data={'name': 'Ada', 'email': 'ada@example.com', 'course': 'Python'})
+    assert response.status_code == 302
+    page = client.get('/').get_data(as_text=True)
+    assert 'Ada' in page and 'ada@example.com' in page
+
+
+def test_add_student_requires_every_field(client):
+    response = client.post('/add', data={'name': 'Ada', 'email': '', 'course': 'Python'})
+    assert response.status_code == 200
+    assert 'All fields are required!' in response.get_data(as_text=True)
+    assert 'ada@example.com' not in client.get('/').get_data(as_text=True)
+
+
+def test_add_sample(client):
+    assert client.get('/add_sample').status_code == 302
+    assert 'Diana Prince' in client.get('/').get_data(as_text=True)
+
+
+def test_pages(m, client):
+    add_students(m, 7)
+    first = client.get('/?sort=name&per_page=5').get_data(as_text=True)
+    assert 'Student 000' in first and 'Student 004' in first
+    assert 'Student 005' not in first
+
+    second = client.get('/?sort=name&per_page=5&after=5:Student 004').get_data(as_text=True)
+    assert 'Student 005' in second and 'Student 006' in second
+    assert 'Student 004' not in second
+
+
+def test_all_rows_stream(m, client):
+    add_students(m, 120)
+    response = client.get('/?all=1')
+    assert response.is_streamed
+    page = response.get_data(as_text=True)
+    assert page.count('mailto:') == 120
+
+
+def test_server_timing_and_metrics(m, client):
+    add_students(m, 3)
+    response = client.get('/')
+    assert response.headers['Server-Timing'].startswith('db;dur=')
+    assert '2 queries' in response.headers['Server-Timing']
+
+    metrics = client.get('/metrics').get_json()
+    assert metrics['endpoints']['index']['requests'] == 1
+    assert metrics['endpoints']['index']['queries'] == 2
+
+
+def test_gzip(m, client):
+    add_students(m, 50)
+    response = client.get('/', headers={'Accept-Encoding': 'gzip'})
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert 'Accept-Encoding' in response.headers['Vary']
@@ -0,0 +1,142 @@
+import importlib.util
+import os
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture
+def m(load_app):
+    m = load_app('part-2')
+    m.init_db()
+    return m
+
+
+@pytest.fixture
+def client(m):
+    return m.app.test_client()
+
+
+def add_students(m, count):
+    with m.app.app_context():
+        conn = m.get_db_connection()
+        conn.executemany('INSERT INTO students (name, email, course) VALUES (?, ?, ?)',
+                         ((f'Student {i:03}', f's{i}@example.com', 'Python') for i in range(count)))
+        conn.commit()
+
+
+def get_student(m, id):
+    with m.app.app_context():
+        row = m.get_db_connection().execute('SELECT * FROM students WHERE id = ?', (id,)).fetchone()
+        return dict(row) if row else None
+
+
+def test_add_student(m, client):
+    response = client.post('/add', data={'name': 'Ada', 'email': 'ada@example.com', 'course': 'Python'})
+    assert response.status_code == 302
+    assert get_student(m, 1) == {'id': 1, 'name': 'Ada', 'email': 'ada@example.com', 'course': 'Python'}
+
+    page = client.get('/').get_data(as_text=True)
+    assert 'Student added successfully!' in page and 'ada@example.com' in page
+
+
+def test_add_student_with_taken_email(m, client):
+    add_students(m, 1)
+    response = client.post('/add', data={'name': 'Ada', 'email': 's0@example.com', 'course': 'Python'},
+                           follow_redirects=True)
+    assert response.request.path == '/add'
+    assert 'Email already exists!' in response.get_data(as_text=True)
+    assert get_student(m, 2) is None
+
+
+def test_taken_email_changes_nothing(m, client):
+    add_students(m, 2)
+    client.post('/add', data={'name': 'Ada', 'email': 's0@example.com', 'course': 'Python'})
+    client.post('/edit/2', data={'name': 'Ada', 'email': 's0@example.com', 'course': 'Java'})
+
+    # The failed writes were rolled back and the next one goes through
+    response = client.post('/add', data={'name': 'Ada', 'email': 'ada@example.com', 'course': 'Python'})
+    assert response.headers['Location'] == '/'
+    assert get_student(m, 3)['email'] == 'ada@example.com'
+    assert get_student(m, 2)['course'] == 'Python'
+
+
+def test_search(m, client):
+    add_students(m, 12)
+    page = client.get('/search?q=Student 01').get_data(as_text=True)
+    assert 'Student 010' in page and 'Student 011' in page
+    assert 'Student 009' not in page
+
+
+def test_empty_search_redirects(client):
+    response = client.get('/search?q=')
+    assert response.status_code == 302
+    assert response.headers['Location'] == '/'
+
+
+def test_pages(m, client):
+    add_students(m, 7)
+    first = client.get('/?per_page=5').get_data(as_text=True)
+    assert 'Student 006' in first and 'Student 002' in first
+    assert 'Student 001' not in first
+
+    second = client.get('/?per_page=5&after=3').get_data(as_text=True)
+    assert 'Student 001' in second and 'Student 000' in second
+    assert 'Student 002' not in second
+
+
+def test_edit_student(m, client):
+    add_students(m, 2)
+    assert 's0@example.com' in client.get('/edit/1').get_data(as_text=True)
+
+    response = client.post('/edit/1', data={'name': 'Ada', 'email': 'ada@example.com', 'course': 'Java'})
+    assert response.status_code == 302
+    assert get_student(m, 1) == {'id': 1, 'name': 'Ada', 'email': 'ada@example.com', 'course': 'Java'}
+
+
+def test_edit_student_with_taken_email(m, client):
+    add_students(m, 2)
+    response = client.post('/edit/1', data={'name': 'Ada', 'email': 's1@example.com', 'course': 'Java'},
+                           follow_redirects=True)
+    assert response.request.path == '/edit/1'
+    assert 'Email already exists!' in response.get_data(as_text=True)
+    assert get_student(m, 1)['email'] == 's0@example.com'
+
+
+def test_delete_student(m, client):
+    add_students(m, 2)
+    assert client.get('/delete/1').status_code == 302
+    assert get_student(m, 1) is None
+    assert get_student(m, 2) is not None
+
+
+def test_static_file(client):
+    response = client.get('/static/css/style.css')
+    assert response.status_code == 200
+    assert response.mimetype == 'text/css'
+    response.close()
+
+
+def test_built_assets(load_app, tmp_path, monkeypatch):
+    load_app('part-2')  # copies the part to tmp_path
+    spec = importlib.util.spec_from_file_location('build_assets', os.path.join(ROOT, 'tools', 'build_assets.py'))
+    build_assets = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(build_assets)
+    monkeypatch.setattr(build_assets, 'ROOT', str(tmp_path))
+    manifest = build_assets.build('part-2')
+
+    m = load_app('part-2')  # started again, with the assets built
+    m.init_db()
+    client = m.app.test_client()
+    hashed = manifest['css/style.css']
+    assert f'/static/{hashed}' in client.get('/').get_data(as_text=True)
+
+    response = client.get(f'/static/{hashed}', headers={'Accept-Encoding': 'gzip'})
+    assert response.status_code == 200
+    assert response.content_encoding == 'gzip'
+    assert response.mimetype == 'text/css'
+    assert response.cache_control.max_age == 365 * 24 * 3600
+    assert response.cache_control.immutable
+    assert 'Accept-Encoding' in response.vary
+    response.close()
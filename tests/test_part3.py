@@ -0,0 +1,118 @@
+import re
+
+import pytest
+from sqlalchemy import event, exc
+
+
+@pytest.fixture
+def m(load_app):
+    m = load_app('part-3')
+    m.init_db()  # 2 teachers, 3 courses, 3 students
+    return m
+
+
+@pytest.fixture
+def client(m):
+    return m.app.test_client()
+
+
+def test_students(client):
+    page = client.get('/').get_data(as_text=True)
+    for name in ('Rahul', 'Pooja', 'Aman'):
+        assert name in page
+    assert 'Python Basics' in page and 'Amit Sharma' in page  # course and teacher
+
+
+def test_courses_stream(client):
+    response = client.get('/courses')
+    assert response.is_streamed
+    page = response.get_data(as_text=True)
+    assert [int(n) for n in re.findall(r'(\d+) students enrolled', page)] == [0, 1, 2]  # newest first
+    assert 'Neha Verma' in page
+
+
+def test_teachers(client):
+    page = client.get('/teachers').get_data(as_text=True)
+    assert re.findall(r'<td>(\d+)</td>', page) == ['2', '1']  # Amit Sharma, Neha Verma
+
+
+def test_add_student(m, client):
+    response = client.post('/add', data={'name': 'Ada', 'email': 'ada@example.com', 'course_id': '3'})
+    assert response.status_code == 302
+    with m.app.app_context():
+        student = m.Student.query.filter_by(email='ada@example.com').one()
+        assert student.course.name == 'Data Science'
+
+
+def test_add_student_with_unknown_course(m, client):
+    # SQLite doesn't enforce foreign keys unless asked to, and this app never did
+    response = client.post('/add', data={'name': 'Ada', 'email': 'ada@example.com', 'course_id': '99'})
+    assert response.status_code == 302
+    with m.app.app_context():
+        assert m.Student.query.filter_by(email='ada@example.com').one().course is None
+
+
+def test_add_course_and_teacher(m, client):
+    client.post('/add-teacher', data={'name': 'Grace', 'email': 'grace@example.com'})
+    response = client.post('/add-course', data={'name': 'Compilers', 'description': '', 'teacher_id': '3'})
+    assert response.status_code == 302
+
+    page = client.get('/courses').get_data(as_text=True)
+    assert 'Compilers' in page and 'Grace' in page
+
+
+def count_statements(m, client, path):
+    """Number of SQL statements a GET of path runs"""
+    statements = []
+    def before_cursor_execute(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    with m.app.app_context():
+        engine = m.db.engine
+    event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        assert client.get(path).status_code == 200
+    finally:
+        event.remove(engine, 'before_cursor_execute', before_cursor_execute)
+    return len(statements)
+
+
+@pytest.mark.parametrize('path', ['/', '/courses', '/teachers'])
+def test_statements_dont_grow_with_rows(m, client, path):
+    before = count_statements(m, client, path)
+
+    # 20 more teachers, each with a course that has a student
+    with m.app.app_context():
+        for i in range(20):
+            teacher = m.Teacher(name=f'Teacher {i}', email=f't{i}@example.com')
+            course = m.Course(name=f'Course {i}', teacher=teacher)
+            m.db.session.add(m.Student(name=f'Student {i}', email=f's{i}@example.com', course=course))
+        m.db.session.commit()
+
+    assert count_statements(m, client, path) == before
+
+
+def test_student_pages(m, client):
+    with m.app.app_context():
+        m.db.session.add_all(m.Student(name=f'Student {i}', email=f's{i}@example.com', course_id=1)
+                             for i in range(4))
+        m.db.session.commit()
+
+    # 7 students by name: Aman, Pooja, Rahul, Student 0..3
+    first = client.get('/?per_page=3').get_data(as_text=True)
+    assert 'Aman' in first and 'Rahul' in first and 'Student 0' not in first
+    next_position = re.search(r'after=([^"&]+)', first).group(1)
+
+    second = client.get(f'/?per_page=3&after={next_position}').get_data(as_text=True)
+    assert 'Student 0' in second and 'Student 2' in second and 'Rahul' not in second
+    previous = re.search(r'before=([^"&]+)', second).group(1)
+    assert 'Aman' in client.get(f'/?per_page=3&before={previous}').get_data(as_text=True)
+
+
+def test_failed_statements_leave_nothing_behind(m):
+    with m.app.app_context(), m.db.engine.connect() as conn:
+        for _ in range(3):
+            with pytest.raises(exc.OperationalError):
+                conn.exec_driver_sql('SELECT * FROM no_such_table')
+        assert not conn.info.get('query_start')
+        assert conn.exec_driver_sql('SELECT 1').scalar() == 1
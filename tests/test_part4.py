@@ -0,0 +1,385 @@
+"""
+The part-4 API tests run against both app.py (Flask) and async_app.py
+(Quart + AsyncSession): the two must behave the same.
+"""
+
+import asyncio
+import json
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+
+class QuartClient:
+    """Quart's test client behind the blocking interface of Flask's"""
+
+    def __init__(self, app):
+        self.client = app.test_client()
+        self.loop = asyncio.new_event_loop()  # one loop for the test, the pooled connections belong to it
+
+    def run(self, coroutine):
+        return self.loop.run_until_complete(coroutine)
+
+    def open(self, path, method='GET', **kwargs):
+        return self.run(self._open(path, method, **kwargs))
+
+    async def _open(self, path, method, **kwargs):
+        response = await self.client.open(path, method=method, **kwargs)
+        data = await response.get_data()
+        return SimpleNamespace(
+            status_code=response.status_code,
+            headers=response.headers,
+            mimetype=response.mimetype,
+            data=data,
+            json=json.loads(data) if response.mimetype == 'application/json' else None,
+        )
+
+    def get(self, path, **kwargs):
+        return self.open(path, 'GET', **kwargs)
+
+    def post(self, path, **kwargs):
+        return self.open(path, 'POST', **kwargs)
+
+    def put(self, path, **kwargs):
+        return self.open(path, 'PUT', **kwargs)
+
+    def delete(self, path, **kwargs):
+        return self.open(path, 'DELETE', **kwargs)
+
+
+@pytest.fixture(params=['app.py', 'async_app.py'])
+def api(request, load_app):
+    """A test client for either app, with the 3 sample authors and books"""
+    m = load_app('part-4', request.param)
+    if request.param == 'app.py':
+        m.init_db()
+        yield m.app.test_client()
+        return
+
+    client = QuartClient(m.app)
+    client.run(m.init_db())
+    yield client
+    client.run(m.engine.dispose())
+    client.loop.close()
+
+
+NEW_BOOK = {'title': 'Fluent Python', 'author': 'Luciano Ramalho', 'year': 2022, 'isbn': '978-1492056355'}
+
+
+def test_list_books(api):
+    body = api.get('/api/books').json
+    assert body['total_items'] == 3
+    assert [b['title'] for b in body['books']] == ['Python Crash Course', 'Flask Web Development', 'Clean Code']
+
+
+def test_list_books_sorted_and_paged(api):
+    body = api.get('/api/books?sort=year&order=desc&per_page=2&page=2').json
+    assert body['total_pages'] == 2
+    assert [b['year'] for b in body['books']] == [2008]
+
+
+def test_cursor_pages(api):
+    first = api.get('/api/books?cursor=&sort=title&per_page=2').json
+    assert [b['title'] for b in first['books']] == ['Clean Code', 'Flask Web Development']
+    assert first['has_more']
+
+    second = api.get(f'/api/books?cursor={first["next_cursor"]}&sort=title&per_page=2').json
+    assert [b['title'] for b in second['books']] == ['Python Crash Course']
+    assert not second['has_more']
+
+    assert api.get('/api/books?cursor=not-a-cursor').status_code == 400
+
+
+def test_fields(api):
+    body = api.get('/api/books/1?fields=id,title').json
+    assert body['book'] == {'id': 1, 'title': 'Python Crash Course'}
+
+    response = api.get('/api/books?fields=title,nope')
+    assert response.status_code == 400
+    assert 'nope' in response.json['error']
+
+
+def test_get_book(api):
+    assert api.get('/api/books/2').json['book']['isbn'] == '978-1491991732'
+    assert api.get('/api/books/99').status_code == 404
+
+
+def test_create_book(api):
+    response = api.post('/api/books', json={**NEW_BOOK, 'author_id': 1})
+    assert response.status_code == 201
+    id = response.json['book']['id']
+    assert api.get(f'/api/books/{id}').json['book']['title'] == 'Fluent Python'
+    assert api.get('/api/authors/1').json['author']['books_count'] == 2
+
+
+@pytest.mark.parametrize('data, error', [
+    ({'title': 'No author'}, 'Title and author are required'),
+    ({**NEW_BOOK, 'isbn': '978-0132350884'}, 'ISBN already exists'),
+    ({**NEW_BOOK, 'author_id': 99}, 'Author not found'),
+])
+def test_create_book_errors(api, data, error):
+    response = api.post('/api/books', json=data)
+    assert response.status_code == 400
+    assert response.json['error'] == error
+    assert api.get('/api/books').json['total_items'] == 3
+
+
+def test_update_book(api):
+    response = api.put('/api/books/3', json={'title': 'Clean Code (2nd ed.)', 'author_id': None})
+    assert response.status_code == 200
+    book = api.get('/api/books/3').json['book']
+    assert (book['title'], book['author_id']) == ('Clean Code (2nd ed.)', None)
+    assert api.put('/api/books/99', json={'title': 'x'}).status_code == 404
+
+
+def test_delete_book(api):
+    assert api.delete('/api/books/1').status_code == 200
+    assert api.get('/api/books/1').status_code == 404
+    assert api.get('/api/books').json['total_items'] == 2
+    assert api.delete('/api/books/1').status_code == 404
+
+
+def test_conditional_get(api):
+    first = api.get('/api/books')
+    etag = first.headers['ETag']
+    assert api.get('/api/books', headers={'If-None-Match': etag}).status_code == 304
+
+    api.post('/api/books', json=NEW_BOOK)
+    changed = api.get('/api/books', headers={'If-None-Match': etag})
+    assert changed.status_code == 200
+    assert changed.headers['ETag'] != etag
+    assert changed.json['total_items'] == 4
+
+
+def test_authors(api):
+    body = api.get('/api/authors').json
+    assert [a['books_count'] for a in body['authors']] == [1, 1, 1]
+    assert api.get('/api/authors/2').json['author']['name'] == 'Miguel Grinberg'
+    assert api.get('/api/authors/99').status_code == 404
+
+
+def test_search(api):
+    body = api.get('/api/books/search?q=python').json
+    assert [b['title'] for b in body['books']] == ['Python Crash Course']
+    assert api.get('/api/authors/search?city=portland').json['count'] == 2
+
+
+def test_bulk_create_books(api):
+    response = api.post('/api/books/bulk', json=[
+        NEW_BOOK,
+        {'title': 'No author'},
+        {**NEW_BOOK, 'title': 'Same isbn'},
+        {'title': 'Refactoring', 'author': 'Martin Fowler', 'author_id': 3},
+    ])
+    assert response.status_code == 201
+    body = response.json
+    assert (body['succeeded'], body['failed']) == (2, 2)
+    assert [r['success'] for r in body['results']] == [True, False, False, True]
+    assert body['results'][2]['error'] == 'ISBN already exists'
+    assert api.get('/api/books').json['total_items'] == 5
+
+
+def test_bulk_update_books(api):
+    response = api.put('/api/books/bulk', json=[
+        {'id': 1, 'year': 2023},
+        {'id': 2, 'isbn': '978-0132350884'},  # Clean Code's
+        {'id': 99, 'title': 'Missing'},
+    ])
+    assert [r['success'] for r in response.json['results']] == [True, False, False]
+    assert api.get('/api/books/1').json['book']['year'] == 2023
+
+
+def test_bulk_delete_books(api):
+    response = api.delete('/api/books/bulk', json=[1, 99, 'x'])
+    assert [r['success'] for r in response.json['results']] == [True, False, False]
+    assert api.get('/api/books').json['total_items'] == 2
+
+
+@pytest.mark.parametrize('body', [None, {}, [], 'books'])
+def test_bulk_needs_an_array(api, body):
+    response = api.post('/api/books/bulk', json=body)
+    assert response.status_code == 400
+    assert response.json['error'] == 'Expected a non-empty JSON array'
+
+
+def test_noop_bulk_writes_keep_the_etag(api):
+    etag = api.get('/api/books').headers['ETag']
+    assert api.delete('/api/books/bulk', json=[99]).json['failed'] == 1
+    assert api.put('/api/books/bulk', json=[{'id': 99, 'title': 'Missing'}]).json['failed'] == 1
+    assert api.get('/api/books', headers={'If-None-Match': etag}).status_code == 304
+
+    api.put('/api/books/bulk', json=[{'id': 1, 'year': 2023}])
+    assert api.get('/api/books', headers={'If-None-Match': etag}).status_code == 200
+
+
+def test_noop_bulk_statements_keep_the_version(load_app):
+    m = load_app('part-4')
+    m.init_db()
+    with m.app.app_context():
+        db, Book = m.db, m.Book
+        version = db.session.get(m.TableVersion, 'book').version
+        db.session.execute(db.update(Book).where(Book.id == 99).values(title='x'))
+        Book.query.filter(Book.id.in_([98, 99])).delete(synchronize_session=False)
+        db.session.commit()
+        assert db.session.get(m.TableVersion, 'book').version == version
+
+        Book.query.filter(Book.id == 1).delete(synchronize_session=False)
+        db.session.commit()
+        db.session.expire_all()
+        versions = db.session.get(m.TableVersion, 'book')
+        assert (versions.version, versions.row_count) == (version + 1, 2)
+
+
+def test_bulk_create_rejects_malformed_books(api):
+    response = api.post('/api/books/bulk', json=[
+        {'title': None, 'author': 'x'},
+        {'title': 'x', 'author': ''},
+        {'title': ['x'], 'author': 'x'},
+        {'title': 'x', 'author': 'x', 'author_id': True},
+        {'title': 'x', 'author': 'x', 'author_id': '1'},
+        {'title': 'x', 'author': 'x', 'isbn': ['978-0132350884']},
+        {'title': 'x', 'author': 'x', 'isbn': {}},
+        {'title': 'x', 'author': 'x', 'year': '2020'},
+        {'title': 'x', 'author': 'x', 'year': False},
+        42,
+    ])
+    assert response.status_code == 200
+    assert [r['error'] for r in response.json['results']] == [
+        'Title and author are required',
+        'Title and author are required',
+        'Title and author are required',
+        'Author id must be an integer',
+        'Author id must be an integer',
+        'ISBN must be a string',
+        'ISBN must be a string',
+        'Year must be an integer',
+        'Year must be an integer',
+        'Title and author are required',
+    ]
+    assert api.get('/api/books').json['total_items'] == 3
+
+
+def test_bulk_update_rejects_malformed_books(api):
+    response = api.put('/api/books/bulk', json=[
+        {'id': 1, 'title': None},
+        {'id': 1, 'author': ''},
+        {'id': 1, 'isbn': ['x']},
+        {'id': 1, 'author_id': False},
+        {'id': 1, 'year': 20.5},
+        {'id': True, 'title': 'x'},
+        {'id': 2, 'isbn': None, 'year': None, 'author_id': None},
+    ])
+    assert response.status_code == 200
+    assert [r.get('error') for r in response.json['results']] == [
+        'Title and author are required',
+        'Title and author are required',
+        'ISBN must be a string',
+        'Author id must be an integer',
+        'Year must be an integer',
+        'Book not found',
+        None,
+    ]
+    assert api.get('/api/books/1').json['book']['title'] == 'Python Crash Course'
+    assert api.get('/api/books/2').json['book']['isbn'] is None
+
+
+def test_bulk_rejects_malformed_authors(api):
+    response = api.post('/api/authors/bulk', json=[{'name': None}, {'name': 'x', 'city': 3}, {'name': 'Ada'}])
+    assert [r.get('error') for r in response.json['results']] == [
+        'Name is required', 'City must be a string', None]
+
+    response = api.put('/api/authors/bulk', json=[{'id': 1, 'name': None}, {'id': 1, 'bio': []}])
+    assert [r['error'] for r in response.json['results']] == ['Name is required', 'Bio must be a string']
+
+
+def test_bulk_delete_ignores_true(api):
+    response = api.delete('/api/books/bulk', json=[True])
+    assert response.json['results'][0]['error'] == 'Book not found'
+    assert api.get('/api/books').json['total_items'] == 3
+
+
+def test_cache_stats(api):
+    api.get('/api/books')
+    api.get('/api/books')
+    stats = api.get('/api/cache/stats').json
+    assert (stats['misses'], stats['hits'], stats['hit_rate']) == (1, 1, 0.5)
+    api.post('/api/books', json=NEW_BOOK)
+    assert api.get('/api/cache/stats').json['invalidations'] > 0
+
+
+def test_cache_stats_count_every_thread(load_app):
+    m = load_app('part-4')
+    threads = [threading.Thread(target=lambda: [m.count_cache('hits') for _ in range(10000)])
+               for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert m.cache_stats['hits'] == 80000
+
+
+def test_search_stream(api):
+    response = api.get('/api/books/search?stream=1&fields=id,title')
+    assert response.mimetype == 'application/x-ndjson'
+    lines = response.data.decode().splitlines()
+    assert [json.loads(line)['id'] for line in lines] == [1, 2, 3]
+
+
+def test_abandoned_streams_return_their_connections(load_app):
+    m = load_app('part-4')
+    m.init_db()
+    client = m.app.test_client()
+    for _ in range(20):  # more than the pool holds
+        response = client.get('/api/books/search?stream=1')
+        next(response.response)  # the client reads the first chunk, then goes away
+        response.close()
+    with m.app.app_context():
+        assert m.db.engine.pool.checkedout() == 0
+
+
+def test_cache_follows_writes_from_another_process(load_app):
+    # Two copies of the app on one database file, each with its own cache,
+    # like two workers
+    a, b = load_app('part-4'), load_app('part-4')
+    a.init_db()
+    client_a, client_b = a.app.test_client(), b.app.test_client()
+    assert client_b.get('/api/books').json['total_items'] == 3  # now cached in b
+    assert client_b.get('/api/books/1').json['book']['year'] == 2019
+
+    client_a.post('/api/books', json=NEW_BOOK)
+    client_a.put('/api/books/1', json={'year': 2023})
+
+    response = client_b.get('/api/books')
+    assert response.json['total_items'] == 4
+    assert client_b.get('/api/books', headers={'If-None-Match': response.headers['ETag']}).status_code == 304
+    assert client_b.get('/api/books/1').json['book']['year'] == 2023
+
+
+def test_startup_adds_missing_tables(load_app):
+    # A database from before table_version and the full-text indexes
+    old = load_app('part-4')
+    old.init_db()
+    with old.app.app_context(), old.db.engine.begin() as conn:
+        for table in ('table_version', 'book_fts', 'author_fts'):
+            conn.exec_driver_sql(f'DROP TABLE {table}')
+
+    client = load_app('part-4').app.test_client()  # restart, without init_db()
+    assert client.get('/api/books').json['total_items'] == 3
+    assert client.get('/api/authors').status_code == 200
+    assert client.get('/api/books/search?q=python').json['count'] == 1
+
+    assert client.post('/api/books', json=NEW_BOOK).status_code == 201
+    assert client.get('/api/books/search?q=fluent').json['count'] == 1
+    assert client.get('/api/books?count=cached').json['total_items'] == 4
+
+
+def test_prometheus_metrics(load_app):
+    m = load_app('part-4')
+    m.init_db()
+    client = m.app.test_client()
+    client.get('/api/books')
+    text = client.get('/metrics').get_data(as_text=True)
+    assert 'http_requests_total{endpoint="get_books",method="GET",status="200"} 1' in text
+    assert 'db_pool_wait_seconds_count{engine="primary"}' in text
+    assert client.get('/metrics?format=json').get_json()['endpoints']['get_books']['requests'] == 1
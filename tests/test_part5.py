@@ -0,0 +1,168 @@
+import pytest
+from sqlalchemy import exc
+
+
+@pytest.fixture
+def load(load_app):
+    def load(**env):
+        m = load_app('part-5', **env)
+        m.init_db()  # 3 sample products
+        return m
+    return load
+
+
+@pytest.fixture
+def m(load):
+    return load()
+
+
+@pytest.fixture
+def client(m):
+    return m.app.test_client()
+
+
+def test_products(client):
+    response = client.get('/')
+    assert response.status_code == 200
+    page = response.get_data(as_text=True)
+    for name in ('Laptop', 'Mouse', 'Keyboard'):
+        assert name in page
+    assert 'SQLite' in page
+
+
+def test_add_and_delete_product(m, client):
+    response = client.post('/add', data={'name': 'Monitor', 'price': '199.5', 'stock': '4'})
+    assert response.status_code == 302
+    with m.app.app_context():
+        product = m.Product.query.filter_by(name='Monitor').one()
+        assert (product.price, product.stock) == (199.5, 4)
+        id = product.id
+
+    assert client.get(f'/delete/{id}').status_code == 302
+    with m.app.app_context():
+        assert m.db.session.get(m.Product, id) is None
+    assert client.get(f'/delete/{id}').status_code == 404
+
+
+def test_prometheus_metrics(client):
+    client.get('/')
+    response = client.get('/metrics')
+    assert response.mimetype == 'text/plain'
+    text = response.get_data(as_text=True)
+    assert 'http_requests_total{endpoint="index",method="GET",status="200"} 1' in text
+    assert 'db_pool_wait_seconds_count' in text
+
+
+def test_sql_metrics_json(client):
+    client.get('/')
+    endpoints = client.get('/metrics?format=json').get_json()['endpoints']
+    assert endpoints['index']['requests'] == 1
+    assert endpoints['index']['queries'] >= 1
+
+
+def test_compression(load):
+    client = load().app.test_client()
+    response = client.get('/', headers={'Accept-Encoding': 'gzip'})
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert 'Accept-Encoding' in response.headers['Vary']
+
+    client = load(COMPRESS_MIN_SIZE='1000000').app.test_client()
+    assert 'Content-Encoding' not in client.get('/', headers={'Accept-Encoding': 'gzip'}).headers
+
+
+def test_pool_status(client):
+    client.get('/')
+    status = client.get('/metrics/pool').get_json()
+    assert list(status) == ['primary']
+    primary = status['primary']
+    assert primary['backend'] == 'sqlite'
+    assert primary['pool'] == 'QueuePool'
+    assert primary['checkouts'] >= 1
+    assert primary['settings']['pool_size'] == 5
+
+
+def test_pool_class_from_env(load):
+    m = load(DB_POOL_CLASS='null')
+    assert m.app.test_client().get('/').status_code == 200
+    assert m.app.test_client().get('/metrics/pool').get_json()['primary']['pool'] == 'NullPool'
+
+
+def test_unknown_pool_class(load_app):
+    with pytest.raises(ValueError, match="one of null, queue, static, not 'nope'"):
+        load_app('part-5', DB_POOL_CLASS='nope')
+
+
+def test_pool_stats_per_engine(load, tmp_path):
+    m = load(DATABASE_REPLICA_URLS=f'sqlite:///{tmp_path}/replica.db')
+    client = m.app.test_client()
+    client.get('/')  # read only, runs on the replica
+
+    status = client.get('/metrics/pool').get_json()
+    assert set(status) == {'primary', 'replica0'}
+    assert status['replica0']['checkouts'] >= 1
+
+    text = client.get('/metrics').get_data(as_text=True)
+    assert 'db_pool_size{engine="primary"} 5' in text
+    assert 'db_pool_size{engine="replica0"} 5' in text
+    assert 'db_pool_wait_seconds_count{engine="replica0"}' in text
+
+
+def test_read_replica(load, tmp_path):
+    m = load(DATABASE_REPLICA_URLS=f'sqlite:///{tmp_path}/replica.db')
+    with m.app.app_context():
+        m.db.session.execute(m.db.delete(m.Product).where(m.Product.name == 'Mouse'))
+        m.db.session.commit()
+
+    # The replica was copied at startup and hasn't seen the delete
+    page = m.app.test_client().get('/').get_data(as_text=True)
+    assert 'Mouse' in page
+
+
+@pytest.fixture
+def replicated(load, tmp_path):
+    """part-5 with one replica, copied from the primary at startup"""
+    return load(DATABASE_REPLICA_URLS=f'sqlite:///{tmp_path}/replica.db', REPLICA_STICKY_SECONDS='5')
+
+
+def test_lists_read_from_the_replica(replicated):
+    client = replicated.app.test_client()
+    client.get('/')
+    text = client.get('/metrics').get_data(as_text=True)
+    assert 'db_replica_requests_total{replica="sqlite:///' in text
+    assert client.get('/metrics/pool').get_json()['replica0']['checkouts'] >= 1
+
+
+def test_reads_stick_to_the_primary_after_a_write(replicated):
+    client = replicated.app.test_client()
+    assert 'Monitor' not in client.get('/').get_data(as_text=True)
+
+    client.post('/add', data={'name': 'Monitor', 'price': '199.5', 'stock': '4'})
+    assert client.get_cookie('session') is not None
+    with client.session_transaction() as session:
+        assert 'last_write' in session
+    # Only on the primary: the replica was copied before the write
+    assert 'Monitor' in client.get('/').get_data(as_text=True)
+
+    # Another browser, without the cookie, still reads the replica
+    assert 'Monitor' not in replicated.app.test_client().get('/').get_data(as_text=True)
+
+
+def test_reads_go_back_to_the_replica(replicated):
+    client = replicated.app.test_client()
+    client.post('/add', data={'name': 'Monitor', 'price': '199.5', 'stock': '4'})
+    with client.session_transaction() as session:
+        session['last_write'] -= 6  # REPLICA_STICKY_SECONDS have passed
+    assert 'Monitor' not in client.get('/').get_data(as_text=True)
+
+
+def test_pool_timeouts_are_counted(load):
+    m = load(DB_POOL_SIZE='1', DB_MAX_OVERFLOW='0', DB_POOL_TIMEOUT='0.05')
+    with m.app.app_context():
+        engine = m.db.engine
+        with engine.connect():
+            with pytest.raises(exc.TimeoutError):
+                engine.connect()
+
+    client = m.app.test_client()
+    assert client.get('/metrics/pool').get_json()['primary']['timeouts'] == 1
+    assert 'db_pool_timeouts_total{engine="primary"} 1' in client.get('/metrics').get_data(as_text=True)
@@ -0,0 +1,115 @@
+"""
+Build Static Assets
+===================
+Minifies the CSS and JavaScript files in <part>/static and writes them to
+<part>/static/dist with a hash of their content in the file name:
+
+    static/css/style.css -> static/dist/css/style.1a2b3c4d5e6f.css
+                            static/dist/css/style.1a2b3c4d5e6f.css.gz
+                            static/dist/css/style.1a2b3c4d5e6f.css.br
+
+The .gz copy is gzip level 9, the .br copy brotli quality 11 (only when
+the brotli package is installed). static/dist/manifest.json maps every
+original name to its hashed one. The apps read it at startup (see
+shared/assets.py), so rebuild and restart after changing a file.
+
+How to Run:
+    python tools/build_assets.py              # part-2 and part-4
+    python tools/build_assets.py part-4
+"""
+
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import re
+import shutil
+
+try:
+    import brotli  # optional: pip install brotli
+except ImportError:
+    brotli = None
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PARTS = ['part-2', 'part-4']
+
+
+def minify_css(text):
+    """Drop comments and the whitespace around braces, colons and commas"""
+    text = re.sub(r'/\*.*?\*/', '', text, flags=re.S)
+    text = re.sub(r'\s+', ' ', text)
+    text = re.sub(r'\s*([{};,>])\s*', r'\1', text)
+    text = re.sub(r':\s+', ':', text)
+    return text.replace(';}', '}').strip() + '\n'
+
+
+def minify_js(text):
+    """
+    Drop indentation, blank lines and whole-line // comments. Lines are
+    never joined, so code that relies on automatic semicolons keeps working.
+    """
+    lines = (line.strip() for line in text.splitlines())
+    return '\n'.join(line for line in lines if line and not line.startswith('//')) + '\n'
+
+
+MINIFIERS = {'.css': minify_css, '.js': minify_js}
+
+
+def build(part):
+    """Build one part's assets and return the manifest"""
+    static = os.path.join(ROOT, part, 'static')
+    dist = os.path.join(static, 'dist')
+    shutil.rmtree(dist, ignore_errors=True)
+
+    manifest = {}
+    for folder, dirs, files in os.walk(static):
+        for filename in sorted(files):
+            base, ext = os.path.splitext(filename)
+            if ext not in MINIFIERS:
+                continue
+            source = os.path.join(folder, filename)
+            name = os.path.relpath(source, static).replace(os.sep, '/')
+            with open(source, encoding='utf-8') as f:
+                original = f.read()
+            data = MINIFIERS[ext](original).encode('utf-8')
+
+            digest = hashlib.sha256(data).hexdigest()[:12]
+            hashed = f'dist/{os.path.dirname(name)}/{base}.{digest}{ext}'.replace('//', '/')
+            target = os.path.join(static, hashed)
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            with open(target, 'wb') as f:
+                f.write(data)
+
+            sizes = [f'{len(original.encode("utf-8"))} -> {len(data)} bytes']
+            variants = [('.gz', gzip.compress(data, 9, mtime=0))]
+            if brotli is not None:
+                variants.append(('.br', brotli.compress(data, quality=11)))
+            for suffix, compressed in variants:
+                with open(target + suffix, 'wb') as f:
+                    f.write(compressed)
+                sizes.append(f'{suffix[1:]} {len(compressed)}')
+
+            manifest[name] = hashed
+            print(f'{part}  {name} -> {hashed}  ({", ".join(sizes)})')
+
+    os.makedirs(dist, exist_ok=True)
+    with open(os.path.join(dist, 'manifest.json'), 'w') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    return manifest
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Minify and fingerprint CSS/JS')
+    parser.add_argument('parts', nargs='*', default=PARTS)
+    args = parser.parse_args()
+
+    if brotli is None:
+        print('brotli is not installed, writing gzip copies only')
+    for part in args.parts:
+        build(part)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,179 @@
+"""
+Index Advisor
+=============
+Runs each app's routes against a throwaway copy of its database, records
+every SQL statement they issue, and runs EXPLAIN QUERY PLAN on it. Any
+statement that makes SQLite read a whole table ("SCAN <table>") is reported
+so you can decide whether it needs an index.
+
+How to Run:
+    python tools/index_advisor.py              # all parts
+    python tools/index_advisor.py part-2 part-4
+    python tools/index_advisor.py --json
+
+Exits with status 1 when a full-table scan is found. SQLite only.
+"""
+
+import argparse
+import importlib.util
+import json
+import os
+import shutil
+import sqlite3
+import sqlite3.dbapi2
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+STUDENT_FORM = {'name': 'Index Advisor', 'email': 'advisor@example.com', 'course': 'Python'}
+
+# Requests that exercise each app's queries. GET routes without URL
+# arguments are added automatically.
+EXAMPLE_REQUESTS = {
+    'part-1': [
+        ('POST', '/add', {'data': STUDENT_FORM}),
+    ],
+    'part-2': [
+        ('GET', '/search?q=a', {}),
+        ('POST', '/add', {'data': STUDENT_FORM}),
+        ('GET', '/edit/1', {}),
+        ('POST', '/edit/1', {'data': STUDENT_FORM}),
+    ],
+    'part-3': [],
+    'part-4': [
+        ('GET', '/api/books?sort=title', {}),
+        ('GET', '/api/books?sort=year&cursor=', {}),
+        ('GET', '/api/books/1', {}),
+        ('GET', '/api/authors?sort=city', {}),
+        ('GET', '/api/authors/1', {}),
+        ('GET', '/api/books/search?q=python&year=2019', {}),
+        ('GET', '/api/books/search?author_id=1', {}),
+        ('GET', '/api/authors/search?name=eric&city=port', {}),
+        ('POST', '/api/books', {'json': {'title': 'Advisor', 'author': 'Advisor',
+                                         'isbn': 'advisor-1', 'author_id': 1}}),
+    ],
+    'part-5': [],
+}
+
+
+def load_app(part, workdir):
+    """Import <workdir>/app.py as a fresh module and return it"""
+    spec = importlib.util.spec_from_file_location(f'{part.replace("-", "_")}_app',
+                                                  os.path.join(workdir, 'app.py'))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def record_statements(statements):
+    """
+    Patch sqlite3.connect so every connection reports what it runs.
+    SQLAlchemy goes through sqlite3.dbapi2, so that is patched too.
+    """
+    original_connect = sqlite3.connect
+
+    def connect(database, *args, **kwargs):
+        conn = original_connect(database, *args, **kwargs)
+        path = os.path.abspath(database) if database != ':memory:' else None
+        conn.set_trace_callback(lambda sql: statements.append((path, sql)))
+        return conn
+
+    sqlite3.connect = sqlite3.dbapi2.connect = connect
+    return original_connect
+
+
+def is_query(sql):
+    words = sql.lstrip().split(None, 1)
+    return bool(words) and words[0].upper() in ('SELECT', 'UPDATE', 'DELETE', 'WITH')
+
+
+def full_scans(path, sql, connect):
+    """Return the EXPLAIN QUERY PLAN lines that scan a whole table"""
+    conn = connect(path)
+    try:
+        tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+        plan = conn.execute('EXPLAIN QUERY PLAN ' + sql).fetchall()
+    except sqlite3.Error:
+        return []
+    finally:
+        conn.close()
+    # "SCAN book" is a full scan; "SCAN book USING INDEX ..." walks an index,
+    # and scans of subqueries (anon_1) or virtual tables aren't real tables
+    return [detail for _, _, _, detail in plan
+            if detail.startswith('SCAN ') and 'USING' not in detail
+            and 'VIRTUAL TABLE' not in detail and detail.split()[1] in tables]
+
+
+def advise(part):
+    """Run one part's routes and return a list of findings"""
+    tmp = tempfile.mkdtemp(prefix=f'advisor-{part}-')
+    workdir = os.path.join(tmp, part)
+    shutil.copytree(os.path.join(ROOT, part), workdir)
+    shutil.copytree(os.path.join(ROOT, 'shared'), os.path.join(tmp, 'shared'))  # imported by app.py
+    cwd = os.getcwd()
+    os.chdir(workdir)
+
+    statements = []
+    original_connect = record_statements(statements)
+    try:
+        module = load_app(part, workdir)
+        app = getattr(module, 'app', None)
+        if app is None:
+            return []
+        app.logger.disabled = True  # routes that need query args just fail quietly
+        if hasattr(module, 'init_db'):
+            module.init_db()
+        statements.clear()  # only the routes' queries are interesting
+
+        requests = [('GET', rule.rule, {}) for rule in app.url_map.iter_rules()
+                    if 'GET' in rule.methods and not rule.arguments and rule.endpoint != 'static']
+        requests += EXAMPLE_REQUESTS.get(part, [])
+
+        client = app.test_client()
+        findings = []
+        seen = set()
+        for method, url, kwargs in requests:
+            start = len(statements)
+            client.open(url, method=method, **kwargs)
+            for path, sql in statements[start:]:
+                if path is None or not is_query(sql) or sql in seen:
+                    continue
+                seen.add(sql)
+                for detail in full_scans(path, sql, original_connect):
+                    findings.append({'part': part, 'request': f'{method} {url}',
+                                     'plan': detail, 'sql': ' '.join(sql.split())})
+        return findings
+    finally:
+        sqlite3.connect = sqlite3.dbapi2.connect = original_connect
+        os.chdir(cwd)
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Flag full-table scans in route queries')
+    parser.add_argument('parts', nargs='*', default=sorted(EXAMPLE_REQUESTS))
+    parser.add_argument('--json', action='store_true', help='print findings as JSON')
+    args = parser.parse_args()
+
+    findings = []
+    for part in args.parts:
+        try:
+            findings += advise(part)
+        except Exception as e:  # e.g. part-5 without python-dotenv installed
+            print(f'{part}: skipped ({e})', file=sys.stderr)
+
+    if args.json:
+        print(json.dumps(findings, indent=2))
+    else:
+        for f in findings:
+            print(f"{f['part']}  {f['request']}")
+            print(f"    {f['plan']}  <- full table scan")
+            print(f"    {f['sql']}")
+        print(f'{len(findings)} full table scan(s) found')
+
+    sys.exit(1 if findings else 0)
+
+
+if __name__ == '__main__':
+    main()